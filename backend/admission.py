@@ -0,0 +1,140 @@
+"""
+Contrôle d'admission des appels au LLM.
+
+Au plus `max_concurrency` appels sont en cours ; les suivants attendent dans
+une file bornée, avec un délai maximal. La file est équitable : une file
+FIFO par client, servies à tour de rôle, pour qu'un client en rafale ne
+retarde pas les autres. File pleine ou attente trop longue : la requête est
+rejetée avec une estimation du délai avant de réessayer (Retry-After).
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Clé du client de la requête en cours, posée par un middleware HTTP
+current_client: ContextVar[str] = ContextVar("current_client", default="anonymous")
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        max_queue: int = 64,
+        max_queue_per_client: int = 8,
+        max_wait_seconds: float = 10.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queue_per_client = max_queue_per_client
+        self.max_wait_seconds = max_wait_seconds
+        self.active = 0
+        self.queued = 0
+        # Files d'attente par client, dans l'ordre de service (tourniquet)
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._hold_seconds = 1.0  # Durée moyenne d'occupation d'une place (moyenne mobile)
+        self.admitted = 0
+        self.waited = 0
+        self.rejected: Dict[str, int] = {}
+
+    def _retry_after(self) -> int:
+        # Temps pour écouler la file actuelle avec toutes les places
+        return max(1, math.ceil(self._hold_seconds * (self.queued + 1) / self.max_concurrency))
+
+    def _reject(self, reason: str, client: str):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        logger.warning(f"LLM admission rejected ({reason}) for {client}")
+        raise AdmissionRejected(reason, self._retry_after())
+
+    async def _acquire(self, client: str, max_wait: float):
+        if self.active < self.max_concurrency and not self.queued:
+            self.active += 1
+            return
+        if self.queued >= self.max_queue:
+            self._reject("queue_full", client)
+        queue = self._queues.get(client)
+        if queue is not None and len(queue) >= self.max_queue_per_client:
+            self._reject("client_queue_full", client)
+
+        waiter = asyncio.get_running_loop().create_future()
+        if queue is None:
+            queue = self._queues[client] = deque()
+        queue.append(waiter)
+        self.queued += 1
+        self.waited += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Place attribuée au moment de l'abandon : on la rend
+                self._release()
+            else:
+                waiter.cancel()
+                self._discard(client, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject("wait_timeout", client)
+            raise
+
+    def _discard(self, client: str, waiter: asyncio.Future):
+        queue = self._queues.get(client)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self.queued -= 1
+        if not queue:
+            del self._queues[client]
+
+    def _release(self):
+        self.active -= 1
+        while self._queues and self.active < self.max_concurrency:
+            client, queue = self._queues.popitem(last=False)
+            waiter = queue.popleft()
+            self.queued -= 1
+            if queue:
+                # Le client repasse en fin de tourniquet
+                self._queues[client] = queue
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, client: str, max_wait: Optional[float] = None):
+        """Place d'appel au LLM ; AdmissionRejected si la file est saturée.
+
+        `max_wait` raccourcit l'attente maximale (budget restant de la requête).
+        """
+        wait = self.max_wait_seconds if max_wait is None else max(0.0, min(max_wait, self.max_wait_seconds))
+        await self._acquire(client, wait)
+        self.admitted += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._hold_seconds = 0.9 * self._hold_seconds + 0.1 * (time.monotonic() - started)
+            self._release()
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "clients_waiting": len(self._queues),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "waited": self.waited,
+            "rejected": dict(self.rejected),
+            "avg_hold_ms": round(self._hold_seconds * 1000, 1),
+        }
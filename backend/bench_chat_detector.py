@@ -0,0 +1,89 @@
+"""
+Microbenchmark des heuristiques du chat : ancien balayage multiple vs chat_detector.
+
+Usage : python bench_chat_detector.py [iterations]
+"""
+import sys
+import timeit
+
+from chat_detector import DATE_ANSWER_WORDS, detect
+
+MESSAGES = [
+    "dentiste demain 10h",
+    "Rdv 30 novembre 14h medecin",
+    "appeler maman",
+    "14h",
+    "demain",
+    "acheter du pain, appeler Paul puis aller à la pharmacie ensuite courses",
+    "le 20/11 rendez-vous chez le médecin à 9h30",
+    "vendredi 18h dîner avec Marie au restaurant italien",
+    "Et à quelle heure? ⏰",
+    "Ok! Pour 'dentiste', c'est pour quand? 📅",
+]
+
+
+def legacy_signals(message: str) -> tuple:
+    """Reproduit le balayage de l'ancienne version d'intelligent_chat_assistant"""
+    from datetime import datetime, timedelta
+    import json
+    import re
+    import pytz
+
+    paris_tz = pytz.timezone('Europe/Paris')
+    today = datetime.now(paris_tz)
+    months_fr = {
+        1: "janvier", 2: "février", 3: "mars", 4: "avril", 5: "mai", 6: "juin",
+        7: "juillet", 8: "août", 9: "septembre", 10: "octobre", 11: "novembre", 12: "décembre"
+    }
+    days_fr = {
+        0: "lundi", 1: "mardi", 2: "mercredi", 3: "jeudi", 4: "vendredi", 5: "samedi", 6: "dimanche"
+    }
+    today_str = f"{days_fr[today.weekday()]} {today.day} {months_fr[today.month]} {today.year}"
+
+    content = message.lower()
+    has_task_keyword = any(word in content for word in ['rappel', 'appel', 'rdv', 'rendez-vous', 'médecin', 'dentiste', 'courses'])
+    waiting_for = None
+    # "c'est pour quand" : question de date ajoutée avec le remplissage local des créneaux
+    if 'manque la date' in content or 'quelle date' in content or 'c\'est quand' in content or 'c\'est pour quand' in content:
+        waiting_for = "date"
+    elif 'manque l\'heure' in content or 'quelle heure' in content or 'à quelle heure' in content:
+        waiting_for = "time"
+    iso_date = re.search(r'\d{4}-\d{2}-\d{2}', content)
+
+    is_bare_time = bool(re.match(r'^\d{1,2}h?\d{0,2}$', message.strip()))
+    short_date_answer = any(word in message.lower() for word in ['demain', 'aujourd\'hui', 'lundi', 'mardi'])
+
+    tasks = []
+    task_indicators = ['et', ',', 'puis', 'après', 'ensuite', 'aussi']
+    if any(indicator in message.lower() for indicator in task_indicators) and len(message.split()) > 5:
+        tasks = re.split(r',|\set\s|\spuis\s|\saprès\s|\sensuite\s|\saussi\s', message)
+        tasks = [t.strip() for t in tasks if len(t.strip()) > 3]
+
+    has_date = bool(any(word in message.lower() for word in ['demain', 'aujourd\'hui', 'lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi', 'samedi', 'dimanche']) or re.search(r'\d{1,2}[/-]\d{1,2}', message.lower()))
+    has_time = bool(re.search(r'\d{1,2}h\d{0,2}|\d{1,2}:\d{2}', message))
+    return (has_task_keyword, waiting_for, iso_date is not None, is_bare_time, short_date_answer,
+            tasks if len(tasks) > 1 else [], has_date, has_time)
+
+
+def detector_signals(message: str) -> tuple:
+    signals = detect(message)
+    tasks = signals.tasks if signals.word_count > 5 and len(signals.tasks) > 1 else []
+    return (signals.has_task_keyword, signals.waiting_for, signals.iso_date is not None,
+            signals.is_bare_time, bool(DATE_ANSWER_WORDS.intersection(signals.date_words)),
+            tasks, signals.has_date, signals.has_time)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    for message in MESSAGES:
+        assert legacy_signals(message) == detector_signals(message), message
+
+    for name, fn in (("legacy", legacy_signals), ("detector", detector_signals)):
+        seconds = timeit.timeit(lambda: [fn(m) for m in MESSAGES], number=iterations)
+        per_message_us = seconds / (iterations * len(MESSAGES)) * 1e6
+        print(f"{name:10} {per_message_us:8.2f} µs/message")
+
+
+if __name__ == "__main__":
+    main()
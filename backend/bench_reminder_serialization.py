@@ -0,0 +1,98 @@
+"""
+Benchmark de la sérialisation des listes de rappels, à travers FastAPI.
+
+Compare l'ancien chemin (pop('_id') -> Reminder(**doc) -> validation du
+response_model -> JSON) au chemin actuel (documents projetés renvoyés par
+FastJSONResponse) pour des listes de 1k et 10k documents.
+
+Usage : python bench_reminder_serialization.py [répétitions]
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+import uuid
+from typing import List
+
+# server.py lit ces variables à l'import ; aucune connexion n'est ouverte ici
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+
+import httpx
+from bson import ObjectId
+from fastapi import FastAPI
+
+from fast_json import FastJSONResponse
+from server import Reminder
+
+# server.py configure la journalisation en INFO : une ligne par requête httpx noierait les résultats
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+SIZES = (1000, 10000)
+
+
+def make_documents(count: int) -> List[dict]:
+    return [
+        {
+            "_id": ObjectId(),
+            "id": str(uuid.uuid4()),
+            "title": f"Rappel {i}",
+            "description": "Rendez-vous chez le médecin" if i % 3 else None,
+            "datetime_iso": f"2026-11-{i % 28 + 1:02d}T{i % 24:02d}:00:00+01:00",
+            "timezone": "Europe/Paris",
+            "status": "scheduled",
+            "recurrence": None,
+            "created_at": "2026-10-16T09:00:00",
+            "updated_at": "2026-10-16T09:00:00",
+            "version": i % 3,
+        }
+        for i in range(count)
+    ]
+
+
+def build_app(documents: List[dict]) -> FastAPI:
+    app = FastAPI()
+    # La projection Mongo exclut _id à la source
+    projected = [{k: v for k, v in doc.items() if k != "_id"} for doc in documents]
+
+    @app.get("/legacy", response_model=List[Reminder])
+    async def legacy():
+        reminders = [dict(doc) for doc in documents]
+        for reminder in reminders:
+            reminder.pop('_id', None)
+        return [Reminder(**reminder) for reminder in reminders]
+
+    @app.get("/fast", response_model=List[Reminder])
+    async def fast():
+        return FastJSONResponse(projected)
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, repeat: int) -> float:
+    await client.get(path)  # échauffement
+    started = time.perf_counter()
+    for _ in range(repeat):
+        response = await client.get(path)
+        response.raise_for_status()
+    return (time.perf_counter() - started) / repeat
+
+
+async def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    for size in SIZES:
+        app = build_app(make_documents(size))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            legacy = await client.get("/legacy")
+            fast = await client.get("/fast")
+            assert legacy.json() == fast.json()
+            for path in ("/legacy", "/fast"):
+                seconds = await measure(client, path, repeat)
+                print(f"{size:6} docs {path:8} {seconds * 1000:9.2f} ms/requête  {size / seconds:12,.0f} docs/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,131 @@
+"""
+Version de modification d'une collection, avec seuil de validation.
+
+Chaque écriture réserve un numéro de séquence (`seq`) avant d'écrire, puis le
+libère une fois l'écriture terminée. La purge des séquences abandonnées, la
+réservation et l'inscription dans la liste des séquences en cours se font
+dans une seule mise à jour atomique du compteur (pipeline d'agrégation).
+La version publiée aux lecteurs (ETag, synchronisation incrémentale, caches)
+est la plus haute séquence dont toutes les précédentes sont terminées : un
+lecteur ne voit jamais une version plus récente qu'un document encore en
+cours d'écriture, même avec des écrivains concurrents qui terminent dans le
+désordre. Une séquence jamais libérée (worker arrêté en pleine écriture)
+est ignorée après `pending_timeout_seconds`.
+
+Les lecteurs fréquents (ETag, caches) passent par `current` : la version
+lue est gardée `max_age_seconds` et rafraîchie dès qu'une écriture de ce
+processus se termine. Les écritures des autres workers sont donc vues avec
+au plus ce retard, sans relire le compteur à chaque requête.
+"""
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeVersion:
+    def __init__(self, collection, key: str, pending_timeout_seconds: float = 30.0, max_age_seconds: float = 0.0):
+        self.collection = collection
+        self.key = key
+        self.pending_timeout = timedelta(seconds=pending_timeout_seconds)
+        self.max_age_seconds = max_age_seconds
+        # (version validée, instant de la lecture) ; la génération change à chaque écriture locale terminée
+        self._snapshot: Optional[Tuple[int, float]] = None
+        self._generation = 0
+        self.expired = 0
+        self.reads = 0
+        self.snapshot_hits = 0
+
+    async def allocate(self, count: int = 1) -> int:
+        """Réserve `count` séquences et renvoie la dernière ; l'appelant les libère avec `release`"""
+        now = datetime.utcnow()
+        cutoff = now - self.pending_timeout
+        # Une seule mise à jour atomique : purge des séquences abandonnées, réservation et inscription
+        pipeline = [
+            {"$set": {
+                "version": {"$ifNull": ["$version", 0]},
+                "pending": {"$filter": {
+                    "input": {"$ifNull": ["$pending", []]},
+                    "as": "entry",
+                    "cond": {"$gte": ["$$entry.at", cutoff]},
+                }},
+            }},
+            {"$set": {
+                "pending": {"$concatArrays": ["$pending", {"$map": {
+                    "input": {"$literal": list(range(1, count + 1))},
+                    "as": "offset",
+                    "in": {"seq": {"$add": ["$version", "$$offset"]}, "at": now},
+                }}]},
+                "version": {"$add": ["$version", count]},
+            }},
+        ]
+        try:
+            before = await self.collection.find_one_and_update(
+                {"_id": self.key}, pipeline, upsert=True, return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # Deux premières réservations concurrentes : le compteur existe maintenant
+            before = await self.collection.find_one_and_update(
+                {"_id": self.key}, pipeline, upsert=True, return_document=ReturnDocument.BEFORE
+            )
+        before = before or {}
+        if any(entry["at"] < cutoff for entry in before.get("pending") or []):
+            self.expired += 1
+            self.invalidate()
+            logger.warning(f"Abandoned {self.key} write sequences expired")
+        return before.get("version", 0) + count
+
+    async def release(self, seqs: List[int]):
+        await self.collection.update_one({"_id": self.key}, {"$pull": {"pending": {"seq": {"$in": seqs}}}})
+        self.invalidate()
+
+    def invalidate(self):
+        """Oublie la version gardée : la prochaine lecture relit le compteur"""
+        self._generation += 1
+        self._snapshot = None
+
+    @asynccontextmanager
+    async def reserve(self, count: int = 1) -> AsyncIterator[int]:
+        """Séquences réservées pour une écriture (renvoie la dernière), libérées à la sortie du bloc"""
+        last = await self.allocate(count)
+        try:
+            yield last
+        finally:
+            await self.release(list(range(last - count + 1, last + 1)))
+
+    async def committed(self) -> int:
+        """Plus haute séquence dont toutes les écritures précédentes sont terminées"""
+        counter = await self.collection.find_one({"_id": self.key})
+        if counter is None:
+            return 0
+        cutoff = datetime.utcnow() - self.pending_timeout
+        pending = [entry["seq"] for entry in counter.get("pending") or [] if entry["at"] >= cutoff]
+        return min(pending) - 1 if pending else counter.get("version", 0)
+
+    async def current(self) -> int:
+        """Version validée, relue au plus toutes les `max_age_seconds`"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot[1] < self.max_age_seconds:
+            self.snapshot_hits += 1
+            return snapshot[0]
+        generation = self._generation
+        read_at = time.monotonic()
+        version = await self.committed()
+        self.reads += 1
+        # Une écriture terminée pendant la lecture rend celle-ci trop ancienne pour être gardée
+        if generation == self._generation:
+            self._snapshot = (version, read_at)
+        return version
+
+    def stats(self) -> dict:
+        return {
+            "expired": self.expired,
+            "reads": self.reads,
+            "snapshot_hits": self.snapshot_hits,
+        }
@@ -0,0 +1,86 @@
+"""
+Détecteur d'intentions et de créneaux pour les heuristiques du chat.
+
+Une seule expression régulière précompilée parcourt le message une fois et
+relève les mots de date, les heures, les séparateurs de tâches multiples,
+les mots-clés de tâche et les questions de l'assistant ("quelle heure?").
+"""
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+DATE_WORDS = ('demain', "aujourd'hui", 'lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi', 'samedi', 'dimanche')
+# Mots acceptés comme réponse courte quand l'assistant a demandé la date
+DATE_ANSWER_WORDS = frozenset(('demain', "aujourd'hui", 'lundi', 'mardi'))
+TASK_KEYWORDS = ('rappel', 'appel', 'rdv', 'rendez-vous', 'médecin', 'dentiste', 'courses')
+
+_SCANNER = re.compile(
+    r"(?P<waiting_date>manque la date|quelle date|c'est quand|c'est pour quand)"
+    r"|(?P<waiting_time>manque l'heure|quelle heure)"
+    r"|(?P<iso_date>\d{4}-\d{2}-\d{2})"
+    r"|(?P<numeric_date>\d{1,2}[/-]\d{1,2})"
+    r"|(?P<time>\d{1,2}h\d{0,2}|\d{1,2}:\d{2})"
+    r"|(?P<date_word>" + "|".join(DATE_WORDS) + r")"
+    r"|(?P<task_keyword>" + "|".join(TASK_KEYWORDS) + r")"
+    r"|(?P<separator>,|\set\s|\spuis\s|\saprès\s|\sensuite\s|\saussi\s)"
+)
+_BARE_TIME_RE = re.compile(r'^\d{1,2}h?\d{0,2}$')
+
+
+@dataclass
+class MessageSignals:
+    date_words: List[str] = field(default_factory=list)
+    time_expressions: List[str] = field(default_factory=list)
+    iso_date: Optional[str] = None
+    has_numeric_date: bool = False
+    has_task_keyword: bool = False
+    waiting_for: Optional[str] = None
+    tasks: List[str] = field(default_factory=list)
+    word_count: int = 0
+    is_bare_time: bool = False
+
+    @property
+    def has_date(self) -> bool:
+        return bool(self.date_words or self.has_numeric_date or self.iso_date)
+
+    @property
+    def has_time(self) -> bool:
+        return bool(self.time_expressions)
+
+
+def detect(message: str) -> MessageSignals:
+    """Analyse le message en un seul passage"""
+    signals = MessageSignals(word_count=len(message.split()))
+    signals.is_bare_time = _BARE_TIME_RE.match(message.strip()) is not None
+
+    # Le découpage des tâches se fait sur le texte d'origine quand les positions coïncident
+    lowered = message.lower()
+    source = message if len(lowered) == len(message) else lowered
+    segment_start = 0
+    segments = []
+    for match in _SCANNER.finditer(lowered):
+        kind = match.lastgroup
+        text = match.group(0)
+        if kind == 'date_word':
+            signals.date_words.append(text)
+        elif kind == 'time':
+            signals.time_expressions.append(text)
+        elif kind == 'iso_date':
+            if signals.iso_date is None:
+                signals.iso_date = text
+        elif kind == 'numeric_date':
+            signals.has_numeric_date = True
+        elif kind == 'task_keyword':
+            signals.has_task_keyword = True
+        elif kind == 'separator':
+            segments.append(source[segment_start:match.start()])
+            segment_start = match.end()
+        elif kind == 'waiting_date':
+            signals.waiting_for = 'date'
+        elif kind == 'waiting_time' and signals.waiting_for is None:
+            signals.waiting_for = 'time'
+
+    if segments:
+        segments.append(source[segment_start:])
+        signals.tasks = [t.strip() for t in segments if len(t.strip()) > 3]
+    return signals
@@ -0,0 +1,36 @@
+"""
+Outils pour la diffusion en Server-Sent Events des réponses du chat.
+"""
+import json
+import re
+from typing import Any, List, Tuple
+
+# Un membre scalaire complet de l'objet JSON : "clé": valeur suivi de , ou }
+_MEMBER_RE = re.compile(
+    r'"(\w+)"\s*:\s*("(?:[^"\\]|\\.)*"|null|true|false|-?\d+(?:\.\d+)?)\s*(?=[,}])'
+)
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Formate un événement SSE avec une charge utile JSON"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class JSONFieldStream:
+    """Extrait les champs d'un objet JSON plat au fur et à mesure qu'il est reçu"""
+
+    def __init__(self):
+        self.text = ""
+        self._emitted = set()
+        self._scan_from = 0
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.text += chunk
+        completed = []
+        for match in _MEMBER_RE.finditer(self.text, self._scan_from):
+            name = match.group(1)
+            self._scan_from = match.end()
+            if name not in self._emitted:
+                self._emitted.add(name)
+                completed.append((name, json.loads(match.group(2))))
+        return completed
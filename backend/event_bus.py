@@ -0,0 +1,114 @@
+"""
+Diffusion en temps réel des modifications de rappels.
+
+Les événements proviennent des change streams MongoDB quand le serveur les
+supporte (replica set) ; sinon les routes publient elles-mêmes leurs
+écritures dans le bus, ce qui suffit pour un déploiement à un seul worker.
+Chaque abonné a sa propre file bornée : un client trop lent perd ses
+événements en attente et reçoit un "resync" l'invitant à repasser par
+GET /api/reminders/changes.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+RESYNC_EVENT = {"type": "resync"}
+
+
+class Subscription:
+    def __init__(self, queue_size: int):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def push(self, event: dict) -> bool:
+        """Ajoute l'événement sans bloquer ; False si la file a débordé"""
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            # Les événements en attente ne servent plus : le client doit resynchroniser
+            self.dropped += self._queue.qsize()
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(RESYNC_EVENT)
+            return False
+
+    async def get(self) -> dict:
+        return await self._queue.get()
+
+
+class EventBus:
+    def __init__(self, queue_size: int = 100, retry_seconds: float = 5.0):
+        self.queue_size = queue_size
+        self.retry_seconds = retry_seconds
+        self.streaming = False
+        self._subscribers: Set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.overflows = 0
+
+    def subscribe(self, queue_size: Optional[int] = None) -> Subscription:
+        subscription = Subscription(queue_size or self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+
+    def publish(self, event: dict):
+        self.published += 1
+        for subscription in self._subscribers:
+            if not subscription.push(event):
+                self.overflows += 1
+
+    def emit(self, event: dict):
+        """Événement issu d'une route : ignoré quand le change stream le fournira déjà"""
+        if not self.streaming:
+            self.publish(event)
+
+    def start(self, watch: Callable[[Optional[Any]], Any], translate: Callable[[dict], Optional[dict]]):
+        """Suit le change stream ouvert par `watch(resume_token)` en tâche de fond"""
+        self._task = asyncio.ensure_future(self._follow(watch, translate))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _follow(self, watch, translate):
+        resume_token = None
+        opened = False
+        while True:
+            try:
+                async with watch(resume_token) as stream:
+                    opened = True
+                    self.streaming = True
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        event = translate(change)
+                        if event is not None:
+                            self.publish(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not opened:
+                    logger.info(f"Change streams unavailable, publishing reminder events in-process: {str(e)}")
+                    return
+                logger.warning(f"Reminder change stream interrupted, resuming: {str(e)}")
+            finally:
+                self.streaming = False
+            await asyncio.sleep(self.retry_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "source": "change_stream" if self.streaming else "in_process",
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "overflows": self.overflows,
+        }
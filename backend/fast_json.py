@@ -0,0 +1,27 @@
+"""
+Réponses JSON rapides pour les routes de rappels.
+
+Utilise orjson quand il est installé, sinon le module json standard. Les
+routes renvoient directement les documents MongoDB déjà projetés, sans
+repasser par la validation du response_model de FastAPI.
+"""
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
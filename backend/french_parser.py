@@ -0,0 +1,340 @@
+"""
+Parseur local d'expressions temporelles en français.
+
+Reconnaît les formulations courantes ("demain 10h", "30 novembre 14h",
+"dans 3 jours", "lundi à 9h30", "le 20/11") sans appel au LLM. Chaque
+résultat porte un score de confiance : le serveur ne l'utilise directement
+que si ce score dépasse son seuil, sinon il bascule sur OpenAI.
+"""
+import re
+import unicodedata
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
+
+import pytz
+
+
+MONTHS_FR = {
+    1: "janvier", 2: "février", 3: "mars", 4: "avril", 5: "mai", 6: "juin",
+    7: "juillet", 8: "août", 9: "septembre", 10: "octobre", 11: "novembre", 12: "décembre"
+}
+DAYS_FR = {
+    0: "lundi", 1: "mardi", 2: "mercredi", 3: "jeudi", 4: "vendredi", 5: "samedi", 6: "dimanche"
+}
+
+_MONTH_NUMBERS = {
+    "janvier": 1, "fevrier": 2, "mars": 3, "avril": 4, "mai": 5, "juin": 6,
+    "juillet": 7, "aout": 8, "septembre": 9, "octobre": 10, "novembre": 11, "decembre": 12
+}
+_WEEKDAY_NUMBERS = {name: number for number, name in DAYS_FR.items()}
+_NUMBER_WORDS = {
+    "un": 1, "une": 1, "deux": 2, "trois": 3, "quatre": 4, "cinq": 5, "six": 6,
+    "sept": 7, "huit": 8, "neuf": 9, "dix": 10, "quinze": 15
+}
+
+_MONTHS_PATTERN = "|".join(_MONTH_NUMBERS)
+_WEEKDAYS_PATTERN = "|".join(_WEEKDAY_NUMBERS)
+_AMOUNT_PATTERN = r"\d{1,3}|" + "|".join(_NUMBER_WORDS)
+
+# Les motifs s'appliquent au texte "replié" (minuscules, sans accents)
+_ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_NUMERIC_DATE_RE = re.compile(r"\b(\d{1,2})[/.-](\d{1,2})(?:[/.-](\d{4}|\d{2}))?\b")
+_TEXT_DATE_RE = re.compile(
+    rf"\b(\d{{1,2}})(?:er)?\s+({_MONTHS_PATTERN})(?:\s+(\d{{4}}))?\b"
+)
+_RELATIVE_DAY_RE = re.compile(r"\b(apres[- ]demain|demain|aujourd'?hui|ce soir|ce matin)\b")
+_WEEKDAY_RE = re.compile(rf"\b({_WEEKDAYS_PATTERN})(\s+prochain)?\b")
+_IN_DELAY_RE = re.compile(
+    rf"\bdans\s+({_AMOUNT_PATTERN})\s+(jours?|semaines?|mois|heures?|minutes?|min)\b"
+)
+_CLOCK_TIME_RE = re.compile(
+    r"\b(\d{1,2})\s?(?:h|heures?)(?:\s?(\d{2}))?(?![a-z0-9])"
+    r"(\s+(?:du soir|de l'apres[- ]midi|du matin))?"
+)
+_COLON_TIME_RE = re.compile(r"\b(\d{1,2}):(\d{2})\b")
+_NOON_RE = re.compile(r"(?<!apres-)(?<!apres )(?<![\w-])(midi|minuit)\b")
+
+_LEADING_PREFIX_RE = re.compile(
+    r"^(?:rappelle[- ]?moi\s+(?:de\s+|d')?|n'oublie pas\s+(?:de\s+|d')?|rappel\s*:\s*)"
+)
+_EDGE_FILLERS = {
+    "a", "au", "le", "la", "les", "l'", "de", "du", "d'", "pour", "et", "ce", "cette",
+    "vers", "prochain", "prochaine", "des", "dès", "à"
+}
+_EDGE_PUNCTUATION = " \t,;:.-!?"
+# Mots temporels que les motifs ne savent pas lire ("la semaine prochaine", "mardi en huit",
+# "jeudi soir") : restés dans le texte, ils signalent une date ou une heure mal comprise
+_TEMPORAL_LEFTOVERS = {
+    "semaine", "semaines", "prochain", "prochaine", "prochains", "prochaines", "suivant", "suivante",
+    "dernier", "derniere", "soir", "soiree", "matin", "matinee", "apres-midi", "nuit", "huit", "quinze",
+    "fin", "debut", "mi", "mois", "annee", "an", "week-end", "weekend", "veille", "lendemain",
+}
+_WORD_RE = re.compile(r"[a-z]+(?:-[a-z]+)*")
+
+# Seuils de confiance des différents cas de figure
+CONFIDENCE_COMPLETE = 0.95
+CONFIDENCE_TIME_ONLY = 0.75
+CONFIDENCE_DATE_ONLY = 0.7
+CONFIDENCE_LEFTOVER_DIGITS = 0.6
+CONFIDENCE_LEFTOVER_TEMPORAL = 0.5
+CONFIDENCE_CONFLICT = 0.4
+CONFIDENCE_NO_TITLE = 0.3
+
+
+@dataclass
+class LocalParse:
+    """Résultat du parseur local, compatible avec ParsedReminder"""
+    title: str
+    date: Optional[str]
+    time: Optional[str]
+    datetime_iso: Optional[str]
+    timezone: str
+    is_ambiguous: bool
+    ambiguity_reason: Optional[str]
+    confidence: float
+
+    def reminder_fields(self) -> dict:
+        return {
+            "title": self.title,
+            "description": None,
+            "date": self.date,
+            "time": self.time,
+            "datetime_iso": self.datetime_iso,
+            "timezone": self.timezone,
+            "is_ambiguous": self.is_ambiguous,
+            "ambiguity_reason": self.ambiguity_reason,
+        }
+
+
+def fold(text: str) -> str:
+    """Minuscules sans accents, en conservant la longueur du texte d'origine"""
+    folded = []
+    for ch in text:
+        if ch in "’`":
+            folded.append("'")
+        else:
+            folded.append(unicodedata.normalize("NFD", ch.lower())[0])
+    return "".join(folded)
+
+
+def _amount(token: str) -> int:
+    return int(token) if token.isdigit() else _NUMBER_WORDS[token]
+
+
+def _safe_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _with_year(today: date, month: int, day: int, year: Optional[int]) -> Optional[date]:
+    """Sans année explicite, une date déjà passée désigne l'année suivante"""
+    if year is not None:
+        return _safe_date(year, month, day)
+    candidate = _safe_date(today.year, month, day)
+    if candidate is not None and candidate < today:
+        candidate = _safe_date(today.year + 1, month, day)
+    return candidate
+
+
+def find_times(folded: str) -> List[Tuple[Tuple[int, int], time]]:
+    """Retourne les heures trouvées avec leur position dans le texte replié"""
+    found = []
+    for match in _CLOCK_TIME_RE.finditer(folded):
+        hour = int(match.group(1))
+        minute = int(match.group(2) or 0)
+        period = (match.group(3) or "").strip()
+        if period and period != "du matin" and hour < 12:
+            hour += 12
+        if hour < 24 and minute < 60:
+            found.append((match.span(), time(hour, minute)))
+    for match in _COLON_TIME_RE.finditer(folded):
+        hour, minute = int(match.group(1)), int(match.group(2))
+        if hour < 24 and minute < 60:
+            found.append((match.span(), time(hour, minute)))
+    for match in _NOON_RE.finditer(folded):
+        found.append((match.span(), time(12, 0) if match.group(1) == "midi" else time(0, 0)))
+    return found
+
+
+def find_dates(folded: str, now: datetime) -> List[Tuple[Tuple[int, int], date, Optional[time]]]:
+    """Retourne les dates trouvées (et l'heure implicite des délais "dans N heures")"""
+    today = now.date()
+    found = []
+    for match in _ISO_DATE_RE.finditer(folded):
+        parsed = _safe_date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        if parsed:
+            found.append((match.span(), parsed, None))
+    for match in _NUMERIC_DATE_RE.finditer(folded):
+        year = match.group(3)
+        if year is not None and len(year) == 2:
+            year = "20" + year
+        parsed = _with_year(today, int(match.group(2)), int(match.group(1)), int(year) if year else None)
+        if parsed:
+            found.append((match.span(), parsed, None))
+    for match in _TEXT_DATE_RE.finditer(folded):
+        year = match.group(3)
+        parsed = _with_year(today, _MONTH_NUMBERS[match.group(2)], int(match.group(1)), int(year) if year else None)
+        if parsed:
+            found.append((match.span(), parsed, None))
+    for match in _RELATIVE_DAY_RE.finditer(folded):
+        word = match.group(1)
+        if word.startswith("apres"):
+            offset = 2
+        elif word == "demain":
+            offset = 1
+        else:
+            offset = 0
+        found.append((match.span(), today + timedelta(days=offset), None))
+    for match in _WEEKDAY_RE.finditer(folded):
+        ahead = (_WEEKDAY_NUMBERS[match.group(1)] - today.weekday()) % 7 or 7
+        found.append((match.span(), today + timedelta(days=ahead), None))
+    for match in _IN_DELAY_RE.finditer(folded):
+        amount, unit = _amount(match.group(1)), match.group(2)
+        if unit.startswith("jour"):
+            found.append((match.span(), today + timedelta(days=amount), None))
+        elif unit.startswith("semaine"):
+            found.append((match.span(), today + timedelta(weeks=amount), None))
+        elif unit == "mois":
+            month_index = today.month - 1 + amount
+            year, month = today.year + month_index // 12, month_index % 12 + 1
+            day = min(today.day, 28) if _safe_date(year, month, today.day) is None else today.day
+            found.append((match.span(), date(year, month, day), None))
+        else:
+            delta = timedelta(hours=amount) if unit.startswith("heure") else timedelta(minutes=amount)
+            target = now + delta
+            found.append((match.span(), target.date(), target.time().replace(second=0, microsecond=0)))
+    return found
+
+
+def _overlaps(span: Tuple[int, int], taken: List[Tuple[int, int]]) -> bool:
+    return any(span[0] < end and start < span[1] for start, end in taken)
+
+
+def _extract_title(message: str, spans: List[Tuple[int, int]]) -> str:
+    kept = []
+    cursor = 0
+    for start, end in sorted(spans):
+        kept.append(message[cursor:start])
+        kept.append(" ")
+        cursor = max(cursor, end)
+    kept.append(message[cursor:])
+    title = " ".join("".join(kept).split())
+
+    prefix = _LEADING_PREFIX_RE.match(fold(title))
+    if prefix:
+        title = title[prefix.end():]
+
+    words = title.strip(_EDGE_PUNCTUATION).split()
+    while words and fold(words[0]).strip(_EDGE_PUNCTUATION) in _EDGE_FILLERS:
+        words.pop(0)
+    while words and fold(words[-1]).strip(_EDGE_PUNCTUATION) in _EDGE_FILLERS:
+        words.pop()
+    title = " ".join(words).strip(_EDGE_PUNCTUATION)
+    return title[:1].upper() + title[1:]
+
+
+def _has_temporal_leftover(folded: str, spans: List[Tuple[int, int]]) -> bool:
+    """True si le texte hors expressions reconnues contient encore un mot temporel"""
+    kept = list(folded)
+    for start, end in spans:
+        kept[start:end] = " " * (end - start)
+    return any(word in _TEMPORAL_LEFTOVERS for word in _WORD_RE.findall("".join(kept)))
+
+
+def _temporal_expressions(folded: str, now: datetime) -> Tuple[List[Tuple[int, int]], List[date], List[time]]:
+    """Positions, dates et heures des expressions temporelles, sans chevauchement"""
+    # Les dates passent en premier pour que "dans 2 heures" ne soit pas lu comme "2h"
+    taken: List[Tuple[int, int]] = []
+    dates = []
+    times = []
+    for span, found_date, implied_time in find_dates(folded, now):
+        if not _overlaps(span, taken):
+            taken.append(span)
+            dates.append(found_date)
+            if implied_time is not None:
+                times.append(implied_time)
+    for span, found_time in find_times(folded):
+        if not _overlaps(span, taken):
+            taken.append(span)
+            times.append(found_time)
+    return taken, dates, times
+
+
+def task_title(message: str, now: datetime) -> str:
+    """Titre d'une tâche, même sans date ni heure ("appeler maman" -> "Appeler maman")"""
+    taken, _, _ = _temporal_expressions(fold(message), now)
+    return _extract_title(message, taken)
+
+
+def parse_slot_time(answer: str, now: datetime) -> Optional[time]:
+    """Heure donnée en réponse à une question ("14h", "14:30", "14") ; None si absente ou ambiguë"""
+    folded = fold(answer).strip()
+    if folded.isdigit() and int(folded) < 24:
+        return time(int(folded), 0)
+    _, _, times = _temporal_expressions(folded, now)
+    return times[0] if len(set(times)) == 1 else None
+
+
+def parse_slot_date(answer: str, now: datetime) -> Optional[date]:
+    """Date donnée en réponse à une question ("demain", "lundi", "le 20/11") ; None si absente ou ambiguë"""
+    _, dates, _ = _temporal_expressions(fold(answer), now)
+    return dates[0] if len(set(dates)) == 1 else None
+
+
+def parse_french_reminder(message: str, now: datetime, timezone: str = "Europe/Paris") -> Optional[LocalParse]:
+    """Analyse un message sans LLM. Retourne None si aucune expression temporelle n'est reconnue."""
+    folded = fold(message)
+    tz = pytz.timezone(timezone)
+
+    taken, dates, times = _temporal_expressions(folded, now)
+    if not dates and not times:
+        return None
+
+    title = _extract_title(message, taken)
+    confidence = CONFIDENCE_COMPLETE
+    is_ambiguous = False
+    ambiguity_reason = None
+
+    if len(set(dates)) > 1 or len(set(times)) > 1:
+        confidence = CONFIDENCE_CONFLICT
+        is_ambiguous = True
+        ambiguity_reason = "Plusieurs dates ou heures différentes dans le message"
+
+    reminder_date = dates[0] if dates else None
+    reminder_time = times[0] if times else None
+
+    if reminder_date is None:
+        # Heure seule : aujourd'hui si elle n'est pas passée, sinon demain
+        reminder_date = now.date()
+        if reminder_time <= now.time():
+            reminder_date += timedelta(days=1)
+        confidence = min(confidence, CONFIDENCE_TIME_ONLY)
+    elif reminder_time is None:
+        confidence = min(confidence, CONFIDENCE_DATE_ONLY)
+        is_ambiguous = True
+        ambiguity_reason = ambiguity_reason or "Heure non précisée"
+
+    if any(ch.isdigit() for ch in title):
+        confidence = min(confidence, CONFIDENCE_LEFTOVER_DIGITS)
+    if _has_temporal_leftover(folded, taken):
+        confidence = min(confidence, CONFIDENCE_LEFTOVER_TEMPORAL)
+    if not title:
+        confidence = min(confidence, CONFIDENCE_NO_TITLE)
+
+    datetime_iso = None
+    if reminder_time is not None:
+        datetime_iso = tz.localize(datetime.combine(reminder_date, reminder_time)).isoformat()
+
+    return LocalParse(
+        title=title,
+        date=reminder_date.isoformat(),
+        time=reminder_time.strftime("%H:%M") if reminder_time is not None else None,
+        datetime_iso=datetime_iso,
+        timezone=timezone,
+        is_ambiguous=is_ambiguous,
+        ambiguity_reason=ambiguity_reason,
+        confidence=confidence,
+    )
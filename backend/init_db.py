@@ -27,13 +27,62 @@ async def init_database():
         await db.reminders.create_index([("id", 1)], unique=True)
         print("✅ Index créé sur le champ 'id' (unique)")
         
-        # Créer l'index sur le champ 'datetime_iso' pour le tri
-        await db.reminders.create_index([("datetime_iso", 1)])
-        print("✅ Index créé sur le champ 'datetime_iso'")
+        # Index triés sur la chaîne 'datetime_iso', remplacés par ceux sur 'due_at'
+        existing = await db.reminders.index_information()
+        for legacy in ("datetime_iso_1", "status_1_datetime_iso_1", "datetime_iso_1_id_1", "status_1_datetime_iso_1_id_1"):
+            if legacy in existing:
+                await db.reminders.drop_index(legacy)
+                print(f"🗑️ Ancien index '{legacy}' supprimé")
         
-        # Créer un index composé pour les requêtes filtrées par status + triées par date
-        await db.reminders.create_index([("status", 1), ("datetime_iso", 1)])
-        print("✅ Index composé créé sur 'status' + 'datetime_iso'")
+        # Créer l'index sur 'due_at' (UTC) pour le tri et les plages de dates ('id' départage les égalités pour la pagination)
+        await db.reminders.create_index([("due_at", 1), ("id", 1)])
+        print("✅ Index créé sur 'due_at' + 'id'")
+        
+        # Index composé partiel : seuls les rappels 'scheduled' y figurent
+        status_index = (await db.reminders.index_information()).get("status_1_due_at_1_id_1")
+        if status_index is not None and "partialFilterExpression" not in status_index:
+            await db.reminders.drop_index("status_1_due_at_1_id_1")
+        await db.reminders.create_index(
+            [("status", 1), ("due_at", 1), ("id", 1)],
+            partialFilterExpression={"status": "scheduled"}
+        )
+        print("✅ Index composé partiel créé sur 'status' + 'due_at' + 'id' (status 'scheduled')")
+        
+        # Synchronisation incrémentale : séquence de modification et suppressions
+        await db.reminders.create_index([("seq", 1)])
+        await db.reminder_tombstones.create_index([("seq", 1)])
+        print("✅ Index créés sur 'reminders.seq' et 'reminder_tombstones.seq'")
+        
+        # Recherche des rappels à archiver : index partiel limité aux statuts terminaux (MongoDB 6.0+)
+        await db.reminders.create_index(
+            [("status", 1), ("updated_at", 1)],
+            partialFilterExpression={"status": {"$in": ["completed", "cancelled"]}}
+        )
+        print("✅ Index partiel créé sur 'status' + 'updated_at' (status 'completed' / 'cancelled')")
+        
+        # Archive des rappels terminés
+        await db.reminders_archive.create_index([("id", 1)], unique=True)
+        await db.reminders_archive.create_index([("due_at", 1), ("id", 1)])
+        await db.reminders_archive.create_index([("status", 1), ("due_at", 1), ("id", 1)])
+        print("✅ Index créés sur 'reminders_archive'")
+        
+        # Index TTL du cache de parsing (expiration après 24h par défaut)
+        await db.parse_cache.create_index(
+            [("created_at", 1)],
+            expireAfterSeconds=int(os.environ.get('PARSE_CACHE_TTL_SECONDS', '86400'))
+        )
+        print("✅ Index TTL créé sur 'parse_cache.created_at'")
+        
+        # Index TTL des sessions de conversation (expiration après 1h d'inactivité par défaut)
+        await db.chat_sessions.create_index(
+            [("updated_at", 1)],
+            expireAfterSeconds=int(os.environ.get('CHAT_SESSION_TTL_SECONDS', '3600'))
+        )
+        print("✅ Index TTL créé sur 'chat_sessions.updated_at'")
+        
+        # Index TTL des seaux de limitation de débit (backend Mongo) : clients inactifs évincés
+        await db.rate_limits.create_index([("expires_at", 1)], expireAfterSeconds=0)
+        print("✅ Index TTL créé sur 'rate_limits.expires_at'")
         
         # Lister tous les indexes
         indexes = await db.reminders.list_indexes().to_list(None)
@@ -0,0 +1,274 @@
+"""
+Politique de résilience des appels au LLM : délai maximal, nouvelles
+tentatives, requêtes doublées et disjoncteur.
+
+Chaque tentative est bornée par un délai. Si elle dépasse le p95 des
+latences récentes, une requête identique est lancée en parallèle et la
+première réponse l'emporte. Les échecs transitoires (délai, connexion, 429,
+5xx) sont retentés avec un backoff exponentiel à gigue. Après une série
+d'échecs consécutifs, le disjoncteur s'ouvre : les appels échouent
+immédiatement jusqu'à ce qu'un appel d'essai réussisse.
+
+Une échéance globale (`deadline_budget`) peut borner l'ensemble d'une
+requête : attente d'admission, tentatives, backoff et paliers de modèles
+puisent dans le même budget, pour répondre avant le délai du client.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Iterator, Optional
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamUnavailableError(Exception):
+    """Le LLM n'a pas répondu (disjoncteur ouvert ou tentatives épuisées)"""
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    pass
+
+
+class DeadlineExceededError(UpstreamUnavailableError):
+    """Budget de temps de la requête épuisé"""
+
+
+# Échéance (time.monotonic) de la requête en cours, partagée par tous ses appels au LLM
+llm_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+
+
+@contextmanager
+def deadline_budget(seconds: float) -> Iterator[float]:
+    """Borne la durée totale des appels du bloc ; une échéance englobante plus proche est conservée"""
+    deadline = time.monotonic() + seconds
+    current = llm_deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = llm_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        llm_deadline.reset(token)
+
+
+def remaining_budget(deadline: Optional[float] = None) -> Optional[float]:
+    """Secondes restantes avant l'échéance (celle de la requête par défaut), None sans échéance"""
+    if deadline is None:
+        deadline = llm_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Délai, connexion, 429 et 5xx ; toute autre erreur (requête invalide, bug) remonte telle quelle"""
+    # APITimeoutError est une APIConnectionError
+    if isinstance(error, (asyncio.TimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+class LatencyWindow:
+    """Latences des derniers appels réussis, pour le seuil de doublement"""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ResilientCaller:
+    def __init__(
+        self,
+        timeout_seconds: float = 20.0,
+        max_attempts: int = 3,
+        backoff_seconds: float = 0.5,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+    ):
+        self.timeout_seconds = timeout_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.latencies = LatencyWindow()
+        # Disjoncteur : closed -> open (échecs consécutifs) -> half_open (un appel d'essai) -> closed
+        self.state = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.short_circuits = 0
+        self.opened = 0
+        self.fallbacks = 0
+        self.deadline_exceeded = 0
+
+    # Disjoncteur
+
+    def _admit(self) -> bool:
+        """True si l'appel est autorisé ; un seul appel d'essai à la fois en half_open"""
+        if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_seconds:
+            self.state = "half_open"
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def _on_success(self):
+        self._consecutive_failures = 0
+        self._probe_in_flight = False
+        if self.state != "closed":
+            logger.info("LLM circuit closed")
+        self.state = "closed"
+
+    def _on_failure(self):
+        self._consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self._consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"LLM circuit opened after {self._consecutive_failures} failures")
+                self.opened += 1
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+    # Appels
+
+    async def call(self, request: Callable[[], Awaitable], hedge: bool = True, deadline: Optional[float] = None):
+        """Exécute `request` (fabrique d'appel, rappelable) avec la politique complète.
+
+        Sans `deadline` explicite, l'échéance de la requête en cours (deadline_budget) s'applique.
+        """
+        if deadline is None:
+            deadline = llm_deadline.get()
+        if deadline is not None and deadline <= time.monotonic():
+            self.deadline_exceeded += 1
+            raise DeadlineExceededError("Budget de temps épuisé avant l'appel au LLM")
+        if not self._admit():
+            self.short_circuits += 1
+            raise CircuitOpenError("LLM circuit open")
+        self.calls += 1
+        last_error: Optional[BaseException] = None
+        for attempt in range(self.max_attempts):
+            if attempt:
+                # Backoff exponentiel à gigue complète
+                delay = random.uniform(0, self.backoff_seconds * 2 ** (attempt - 1))
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    self.deadline_exceeded += 1
+                    break
+                self.retries += 1
+                await asyncio.sleep(delay)
+            # Chaque tentative est bornée par son délai et par ce qui reste du budget
+            timeout = self.timeout_seconds
+            if deadline is not None:
+                timeout = min(timeout, deadline - time.monotonic())
+                if timeout <= 0:
+                    self.deadline_exceeded += 1
+                    break
+            started = time.monotonic()
+            try:
+                result = await self._attempt(request, hedge, timeout)
+            except asyncio.CancelledError:
+                self._probe_in_flight = False
+                raise
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    self.timeouts += 1
+                if not is_retryable(e):
+                    # Requête invalide, authentification, bug local... : le disjoncteur n'est pas concerné
+                    self._probe_in_flight = False
+                    raise
+                last_error = e
+                logger.warning(f"LLM call failed (attempt {attempt + 1}/{self.max_attempts}): {str(e) or type(e).__name__}")
+                continue
+            self.latencies.add(time.monotonic() - started)
+            self._on_success()
+            return result
+        if last_error is None:
+            # Budget épuisé avant la première tentative : rien n'a été demandé à l'upstream
+            self._probe_in_flight = False
+            raise DeadlineExceededError("Budget de temps épuisé avant l'appel au LLM")
+        self.failures += 1
+        self._on_failure()
+        raise UpstreamUnavailableError(f"LLM indisponible: {str(last_error) or type(last_error).__name__}") from last_error
+
+    def record_fallback(self):
+        """Compte une réponse dégradée servie à la place du LLM"""
+        self.fallbacks += 1
+
+    def _hedge_delay(self) -> Optional[float]:
+        if len(self.latencies) < self.hedge_min_samples:
+            return None
+        return self.latencies.quantile(self.hedge_quantile)
+
+    async def _attempt(self, request: Callable[[], Awaitable], hedge: bool, timeout: float):
+        deadline = time.monotonic() + timeout
+        primary = asyncio.ensure_future(request())
+        pending = {primary}
+        try:
+            delay = self._hedge_delay() if hedge else None
+            if delay is not None and delay < timeout:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    self.hedges += 1
+                    pending.add(asyncio.ensure_future(request()))
+            error: Optional[BaseException] = None
+            while pending:
+                remaining = deadline - time.monotonic()
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, remaining), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise asyncio.TimeoutError()
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    # La requête doublée peut encore réussir : l'erreur n'est relevée qu'à la fin
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        p95 = self.latencies.quantile(0.95)
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "short_circuits": self.short_circuits,
+            "opened": self.opened,
+            "fallbacks": self.fallbacks,
+            "deadline_exceeded": self.deadline_exceeded,
+            "p95_latency_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
@@ -0,0 +1,94 @@
+"""
+Routage du parsing entre plusieurs modèles, du moins cher au plus fort.
+
+Chaque message part vers le premier palier ; le résultat n'est accepté que
+s'il passe la validation, sinon le palier suivant est appelé. Le dernier
+palier tranche. Les décisions (acceptation, escalade et sa raison) et la
+latence de chaque palier sont comptées pour ajuster les seuils.
+"""
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TierStats:
+    calls: int = 0
+    accepted: int = 0
+    errors: int = 0
+    escalations: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "accepted": self.accepted,
+            "errors": self.errors,
+            "escalations": dict(self.escalations),
+            "avg_latency_ms": round(self.seconds / self.calls * 1000, 1) if self.calls else None,
+            "max_latency_ms": round(self.max_seconds * 1000, 1),
+        }
+
+
+class ModelRouter:
+    def __init__(self, models: List[str], passthrough: Tuple[type, ...] = ()):
+        if not models:
+            raise ValueError("at least one model is required")
+        self.models = models
+        # Erreurs relevées telles quelles, sans escalade (upstream indisponible pour tous les paliers)
+        self.passthrough = passthrough
+        self._stats = {model: TierStats() for model in models}
+
+    @property
+    def strongest(self) -> str:
+        return self.models[-1]
+
+    def record_latency(self, model: str, seconds: float):
+        stats = self._stats.setdefault(model, TierStats())
+        stats.calls += 1
+        stats.seconds += seconds
+        stats.max_seconds = max(stats.max_seconds, seconds)
+
+    async def run(
+        self,
+        call: Callable[[str], Awaitable[str]],
+        validate: Callable[[str], Tuple[Optional[Any], Optional[str]]],
+    ) -> Any:
+        """Appelle les paliers dans l'ordre jusqu'à un résultat valide.
+
+        `validate` renvoie (résultat, None) pour accepter, ou (résultat éventuel,
+        raison) pour escalader. Au dernier palier, un résultat présent est
+        accepté malgré la raison ; s'il n'y en a pas, l'erreur est levée.
+        """
+        for position, model in enumerate(self.models):
+            last = position == len(self.models) - 1
+            stats = self._stats[model]
+            started = time.monotonic()
+            try:
+                text = await call(model)
+            except Exception as e:
+                self.record_latency(model, time.monotonic() - started)
+                stats.errors += 1
+                if last or isinstance(e, self.passthrough):
+                    raise
+                logger.warning(f"Model {model} failed, escalating: {str(e)}")
+                stats.escalations["error"] = stats.escalations.get("error", 0) + 1
+                continue
+            self.record_latency(model, time.monotonic() - started)
+
+            result, reason = validate(text)
+            if reason is None or (last and result is not None):
+                stats.accepted += 1
+                return result
+            if last:
+                stats.errors += 1
+                raise ValueError(f"{model}: {reason}")
+            logger.info(f"Escalating parse from {model}: {reason}")
+            stats.escalations[reason] = stats.escalations.get(reason, 0) + 1
+
+    def stats(self) -> dict:
+        return {"models": self.models, "tiers": {model: stats.as_dict() for model, stats in self._stats.items()}}
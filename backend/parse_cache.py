@@ -0,0 +1,110 @@
+"""
+Cache à deux niveaux des résultats de parsing OpenAI.
+
+Un LRU en mémoire (taille et TTL bornés) sert les répétitions dans le même
+worker ; derrière lui, une collection MongoDB avec index TTL partage les
+résultats entre workers et survit aux redémarrages.
+"""
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# "dans 2 heures" dépend de l'heure courante, pas seulement de la date de référence
+_TIME_RELATIVE_RE = re.compile(r"\bdans\b.*\b(heures?|minutes?|min)\b")
+
+
+class ParseCache:
+    def __init__(self, collection=None, max_entries: int = 1024, ttl_seconds: int = 86400):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    @staticmethod
+    def make_key(message: str, reference_date: str) -> Optional[str]:
+        """Clé du cache, ou None si le message n'est pas cacheable"""
+        normalized = " ".join(message.lower().split())
+        if _TIME_RELATIVE_RE.search(normalized):
+            return None
+        return hashlib.sha256(f"{reference_date}|{normalized}".encode("utf-8")).hexdigest()
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            await self.collection.create_index([("created_at", 1)], expireAfterSeconds=self.ttl_seconds)
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return value
+            del self._entries[key]
+
+        if self.collection is not None:
+            try:
+                doc = await self.collection.find_one({"_id": key})
+            except Exception as e:
+                logger.warning(f"Parse cache lookup failed: {str(e)}")
+                doc = None
+            # Le moniteur TTL de MongoDB ne passe que toutes les 60s environ
+            if doc and doc["created_at"] > datetime.utcnow() - timedelta(seconds=self.ttl_seconds):
+                self._remember(key, doc["value"])
+                self.persistent_hits += 1
+                return doc["value"]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: dict):
+        self._remember(key, value)
+        self.stores += 1
+        if self.collection is not None:
+            try:
+                await self.collection.replace_one(
+                    {"_id": key},
+                    {"_id": key, "value": value, "created_at": datetime.utcnow()},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.warning(f"Parse cache store failed: {str(e)}")
+
+    def record_llm_call(self, seconds: float):
+        """Enregistre la latence d'un appel LLM réel, pour estimer le temps économisé"""
+        self.llm_calls += 1
+        self.llm_seconds += seconds
+
+    def _remember(self, key: str, value: dict):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.persistent_hits
+        lookups = hits + self.misses
+        avg_llm_seconds = self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+        return {
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "memory_entries": len(self._entries),
+            "llm_calls": self.llm_calls,
+            "avg_llm_latency_ms": round(avg_llm_seconds * 1000, 1),
+            "estimated_llm_seconds_saved": round(hits * avg_llm_seconds, 3),
+        }
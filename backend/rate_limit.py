@@ -0,0 +1,157 @@
+"""
+Limitation de débit par client (seau à jetons).
+
+Chaque politique (appels LLM, CRUD...) a son débit de recharge et sa
+capacité de rafale ; chaque client a un seau par politique. Une requête
+passe s'il reste au moins un jeton et en consomme autant que son coût :
+le seau peut devenir négatif, et cette dette retarde les requêtes
+suivantes. Les appels LLM sont facturés là où ils partent réellement
+(une réponse locale ou en cache ne coûte rien). Deux stockages :
+en mémoire pour un seul worker (table bornée, les seaux inactifs sont
+évincés), ou MongoDB pour partager les seaux entre workers (mise à jour
+atomique par pipeline, expiration TTL des clients inactifs).
+"""
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Tuple
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimited(Exception):
+    """Seau vide pour une opération facturée hors du middleware (appel LLM effectif)"""
+
+    def __init__(self, policy: str, retry_after: int):
+        super().__init__(policy)
+        self.policy = policy
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class TokenBucketPolicy:
+    name: str
+    rate_per_second: float
+    burst: int
+
+    @property
+    def refill_seconds(self) -> float:
+        """Durée pour remplir un seau vide : au-delà, un seau inactif équivaut à un seau neuf"""
+        return self.burst / self.rate_per_second
+
+    def retry_after(self, tokens: float) -> int:
+        return max(1, math.ceil((1 - tokens) / self.rate_per_second))
+
+
+class MemoryBucketStore:
+    def __init__(self, max_buckets: int = 10000):
+        self.max_buckets = max_buckets
+        # (politique, client) -> (jetons, dernière mise à jour), du moins au plus récemment utilisé
+        self._buckets: "OrderedDict[Tuple[str, str], Tuple[float, float]]" = OrderedDict()
+        self._refill_seconds = {}
+        self.evictions = 0
+
+    async def ensure_indexes(self):
+        pass
+
+    async def take(self, policy: TokenBucketPolicy, client: str, cost: int = 1) -> Tuple[bool, float]:
+        """Prend `cost` jetons ; renvoie (accepté, jetons restants)"""
+        now = time.monotonic()
+        key = (policy.name, client)
+        tokens, updated = self._buckets.pop(key, (policy.burst, now))
+        tokens = min(policy.burst, tokens + (now - updated) * policy.rate_per_second)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        self._refill_seconds[policy.name] = policy.refill_seconds
+        self._evict(now)
+        return allowed, tokens
+
+    def _evict(self, now: float):
+        while self._buckets:
+            (name, _), (_, updated) = next(iter(self._buckets.items()))
+            if len(self._buckets) <= self.max_buckets and now - updated < self._refill_seconds[name]:
+                break
+            self._buckets.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "buckets": len(self._buckets), "evictions": self.evictions}
+
+
+class MongoBucketStore:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index([("expires_at", 1)], expireAfterSeconds=0)
+
+    async def take(self, policy: TokenBucketPolicy, client: str, cost: int = 1) -> Tuple[bool, float]:
+        now = datetime.utcnow()
+        elapsed = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        # Recharge puis prélèvement dans la même mise à jour atomique
+        doc = await self.collection.find_one_and_update(
+            {"_id": f"{policy.name}:{client}"},
+            [
+                {"$set": {"tokens": {"$min": [
+                    policy.burst,
+                    {"$add": [{"$ifNull": ["$tokens", policy.burst]}, {"$multiply": [elapsed, policy.rate_per_second]}]},
+                ]}}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", cost]}, "$tokens"]},
+                    "updated_at": now,
+                    "expires_at": now + timedelta(seconds=policy.refill_seconds),
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["allowed"], doc["tokens"]
+
+    def stats(self) -> dict:
+        return {"backend": "mongo"}
+
+
+class RateLimiter:
+    def __init__(self, store, policies):
+        self.store = store
+        self.policies = {policy.name: policy for policy in policies}
+        self.allowed = {name: 0 for name in self.policies}
+        self.limited = {name: 0 for name in self.policies}
+        self.errors = 0
+
+    async def ensure_indexes(self):
+        await self.store.ensure_indexes()
+
+    async def check(self, policy_name: str, client: str, cost: int = 1) -> Tuple[bool, int]:
+        """(accepté, Retry-After en secondes) ; en cas de panne du stockage, la requête passe"""
+        policy = self.policies[policy_name]
+        try:
+            allowed, tokens = await self.store.take(policy, client, cost)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Rate limit store failed, request let through: {str(e)}")
+            return True, 0
+        if allowed:
+            self.allowed[policy_name] += 1
+            return True, 0
+        self.limited[policy_name] += 1
+        return False, policy.retry_after(tokens)
+
+    def stats(self) -> dict:
+        return {
+            **self.store.stats(),
+            "policies": {
+                name: {"rate_per_second": policy.rate_per_second, "burst": policy.burst,
+                       "allowed": self.allowed[name], "limited": self.limited[name]}
+                for name, policy in self.policies.items()
+            },
+            "errors": self.errors,
+        }
@@ -0,0 +1,194 @@
+"""
+Moteur de récurrence des rappels.
+
+Interprète le champ libre `recurrence` : mots-clés ("daily", "tous les
+jours", "chaque lundi", "jours ouvrés"...) ou sous-ensemble RRULE
+(FREQ=DAILY|WEEKLY|MONTHLY|YEARLY, INTERVAL, BYDAY, COUNT, UNTIL). Les
+occurrences sont produites à la demande par un générateur, en heure locale
+du fuseau du rappel (les changements d'heure sont respectés) ; seule la
+prochaine occurrence est matérialisée dans le document.
+"""
+import calendar
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Iterator, Optional, Tuple
+
+import pytz
+
+from french_parser import DAYS_FR, fold
+
+DAILY, WEEKLY, MONTHLY = "DAILY", "WEEKLY", "MONTHLY"
+
+_RRULE_DAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+_WORKING_DAYS = (0, 1, 2, 3, 4)
+
+_KEYWORDS = {
+    DAILY: ("daily", "quotidien", "quotidienne", "tous les jours", "chaque jour"),
+    WEEKLY: ("weekly", "hebdomadaire", "chaque semaine", "toutes les semaines"),
+    MONTHLY: ("monthly", "mensuel", "mensuelle", "chaque mois", "tous les mois"),
+    "YEARLY": ("yearly", "annuel", "annuelle", "chaque annee", "tous les ans"),
+    "WEEKDAYS": ("weekdays", "weekday", "jours ouvres", "en semaine", "du lundi au vendredi"),
+}
+_DAY_RE = re.compile(r"^(?:chaque|tous les) (" + "|".join(DAYS_FR.values()) + r")s?$")
+
+# Garde-fou pour les règles qui ne produisent plus rien (ex. UNTIL dépassé)
+_MAX_EMPTY_PERIODS = 1000
+
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    freq: str
+    interval: int = 1
+    by_day: Tuple[int, ...] = ()
+    count: Optional[int] = None
+    until: Optional[datetime] = None  # Aware
+
+
+def parse_rule(text: Optional[str]) -> Optional[RecurrenceRule]:
+    """Règle de récurrence, None si le rappel n'est pas récurrent ; ValueError si illisible"""
+    if not text or not text.strip():
+        return None
+    normalized = " ".join(fold(text).split())
+    if "freq=" in normalized:
+        return _parse_rrule(text.strip())
+    for freq, words in _KEYWORDS.items():
+        if normalized in words:
+            if freq == "WEEKDAYS":
+                return RecurrenceRule(DAILY, by_day=_WORKING_DAYS)
+            if freq == "YEARLY":
+                return RecurrenceRule(MONTHLY, interval=12)
+            return RecurrenceRule(freq)
+    match = _DAY_RE.match(normalized)
+    if match:
+        weekday = next(number for number, name in DAYS_FR.items() if name == match.group(1))
+        return RecurrenceRule(WEEKLY, by_day=(weekday,))
+    raise ValueError(f"récurrence non reconnue: {text}")
+
+
+def _parse_rrule(text: str) -> RecurrenceRule:
+    if text.upper().startswith("RRULE:"):
+        text = text[6:]
+    parts = {}
+    for part in text.strip().strip(";").split(";"):
+        key, _, value = part.partition("=")
+        parts[key.strip().upper()] = value.strip().upper()
+
+    freq = parts.pop("FREQ", None)
+    interval = int(parts.pop("INTERVAL", "1"))
+    if freq not in (DAILY, WEEKLY, MONTHLY, "YEARLY") or interval < 1:
+        raise ValueError(f"récurrence non reconnue: {text}")
+    if freq == "YEARLY":
+        freq, interval = MONTHLY, interval * 12
+
+    by_day = ()
+    if "BYDAY" in parts:
+        try:
+            by_day = tuple(sorted({_RRULE_DAYS[day] for day in parts.pop("BYDAY").split(",")}))
+        except KeyError:
+            raise ValueError(f"BYDAY non supporté: {text}")
+    count = int(parts.pop("COUNT")) if "COUNT" in parts else None
+    until = _parse_until(parts.pop("UNTIL")) if "UNTIL" in parts else None
+    parts.pop("WKST", None)
+    if parts:
+        raise ValueError(f"paramètres RRULE non supportés: {', '.join(sorted(parts))}")
+    return RecurrenceRule(freq, interval=interval, by_day=by_day, count=count, until=until)
+
+
+def _parse_until(value: str) -> datetime:
+    for fmt in ("%Y%m%dT%H%M%SZ", "%Y%m%dT%H%M%S", "%Y%m%d"):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if fmt == "%Y%m%d":
+            # UNTIL sur une date seule couvre toute la journée
+            parsed = datetime.combine(parsed.date(), time.max)
+        return pytz.utc.localize(parsed)
+    raise ValueError(f"UNTIL illisible: {value}")
+
+
+def parse_datetime(value: str, timezone: Optional[str] = None) -> datetime:
+    """datetime_iso d'un rappel en datetime aware (heure locale du fuseau si sans décalage)"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        try:
+            parsed = pytz.timezone(timezone or "Europe/Paris").localize(parsed)
+        except pytz.UnknownTimeZoneError:
+            raise ValueError(f"fuseau inconnu: {timezone}")
+    return parsed
+
+
+def occurrences(rule: RecurrenceRule, start: datetime, timezone: str, since: Optional[datetime] = None) -> Iterator[datetime]:
+    """Occurrences (datetimes aware) à partir de `start`, limitées à celles >= `since`
+
+    Sans COUNT, le générateur saute directement à la période contenant
+    `since` : le coût ne dépend pas de l'ancienneté de la série.
+    """
+    try:
+        tz = pytz.timezone(timezone)
+    except pytz.UnknownTimeZoneError:
+        raise ValueError(f"fuseau inconnu: {timezone}")
+    local_start = start.astimezone(tz).replace(tzinfo=None)
+    first_period = 0
+    if since is not None and rule.count is None:
+        first_period = max(_periods_between(rule, local_start, since.astimezone(tz).replace(tzinfo=None)) - 1, 0)
+
+    emitted = 0
+    empty_periods = 0
+    period = first_period
+    while empty_periods < _MAX_EMPTY_PERIODS:
+        produced = False
+        for day in _period_days(rule, local_start.date(), period):
+            local = datetime.combine(day, local_start.time())
+            if local < local_start:
+                continue
+            occurrence = tz.normalize(tz.localize(local))
+            if rule.until is not None and occurrence > rule.until:
+                return
+            produced = True
+            emitted += 1
+            if since is None or occurrence >= since:
+                yield occurrence
+            if rule.count is not None and emitted >= rule.count:
+                return
+        empty_periods = 0 if produced else empty_periods + 1
+        period += 1
+
+
+def next_occurrence(rule: RecurrenceRule, start: datetime, timezone: str, after: datetime) -> Optional[datetime]:
+    """Première occurrence strictement postérieure à `after`"""
+    return next(occurrences(rule, start, timezone, since=after + timedelta(microseconds=1)), None)
+
+
+def _periods_between(rule: RecurrenceRule, start: datetime, moment: datetime) -> int:
+    if rule.freq == DAILY:
+        elapsed = (moment.date() - start.date()).days
+    elif rule.freq == WEEKLY:
+        elapsed = (moment.date() - start.date()).days + start.weekday()
+        elapsed //= 7
+    else:
+        elapsed = (moment.year - start.year) * 12 + moment.month - start.month
+    return elapsed // rule.interval
+
+
+def _period_days(rule: RecurrenceRule, start: date, period: int) -> Iterator[date]:
+    if rule.freq == DAILY:
+        day = start + timedelta(days=period * rule.interval)
+        if not rule.by_day or day.weekday() in rule.by_day:
+            yield day
+    elif rule.freq == WEEKLY:
+        monday = start - timedelta(days=start.weekday()) + timedelta(weeks=period * rule.interval)
+        for weekday in rule.by_day or (start.weekday(),):
+            yield monday + timedelta(days=weekday)
+    else:
+        months = start.month - 1 + period * rule.interval
+        year, month = start.year + months // 12, months % 12 + 1
+        days_in_month = calendar.monthrange(year, month)[1]
+        if rule.by_day:
+            for day in range(1, days_in_month + 1):
+                if date(year, month, day).weekday() in rule.by_day:
+                    yield date(year, month, day)
+        elif start.day <= days_in_month:
+            # Comme RRULE : un 31 n'a pas lieu les mois de 30 jours
+            yield date(year, month, start.day)
@@ -0,0 +1,139 @@
+"""
+Archivage des rappels terminés dans une collection froide.
+
+Les rappels "completed" / "cancelled" non modifiés depuis un certain âge sont
+copiés par lots dans `reminders_archive` puis supprimés de la collection
+principale, qui ne contient plus que les rappels vivants. Chaque lot est
+idempotent (index unique sur `id` dans l'archive) : un worker interrompu ou
+deux workers concurrents ne perdent ni ne dupliquent de rappel.
+
+Pour la synchronisation incrémentale, un rappel archivé est une suppression :
+le lot réserve ses séquences avant de supprimer et écrit une pierre tombale
+(`id`, `seq`) par rappel retiré, comme une suppression faite par l'API.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderArchiver:
+    def __init__(
+        self,
+        hot,
+        archive,
+        tombstones,
+        version,
+        statuses=("completed", "cancelled"),
+        age_seconds: int = 30 * 86400,
+        batch_size: int = 500,
+        interval_seconds: int = 3600,
+        on_archived: Optional[Callable[[List[dict]], Awaitable[None]]] = None,
+    ):
+        self.hot = hot
+        self.archive = archive
+        self.tombstones = tombstones
+        # ChangeVersion de la collection principale : séquences des pierres tombales
+        self.version = version
+        self.statuses = list(statuses)
+        self.age_seconds = age_seconds
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.on_archived = on_archived
+        self._task: Optional[asyncio.Task] = None
+        self.archived = 0
+        self.runs = 0
+
+    async def ensure_indexes(self):
+        # Recherche des rappels à archiver ; index partiel limité aux statuts terminaux (MongoDB 6.0+ pour $in)
+        await self.hot.create_index(
+            [("status", 1), ("updated_at", 1)],
+            partialFilterExpression={"status": {"$in": self.statuses}},
+        )
+        await self.archive.create_index([("id", 1)], unique=True)
+        await self.archive.create_index([("due_at", 1), ("id", 1)])
+        await self.archive.create_index([("status", 1), ("due_at", 1), ("id", 1)])
+
+    async def archive_batch(self) -> int:
+        """Archive un lot ; renvoie le nombre de rappels retirés de la collection principale"""
+        # updated_at est une chaîne ISO UTC de format fixe : la comparaison lexicale suit l'ordre des dates
+        cutoff = (datetime.utcnow() - timedelta(seconds=self.age_seconds)).isoformat()
+        query = {"status": {"$in": self.statuses}, "updated_at": {"$lt": cutoff}}
+        docs = await self.hot.find(query).limit(self.batch_size).to_list(self.batch_size)
+        if not docs:
+            return 0
+
+        archived_at = datetime.utcnow()
+        for doc in docs:
+            doc["archived_at"] = archived_at
+        try:
+            await self.archive.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # Déjà archivés par un passage précédent interrompu : seules les autres erreurs comptent
+            errors = [error for error in e.details.get("writeErrors", []) if error.get("code") != 11000]
+            if errors:
+                raise
+
+        ids = [doc["id"] for doc in docs]
+        # Séquences réservées avant la suppression : les lecteurs ne voient le lot qu'avec ses pierres tombales
+        async with self.version.reserve(len(ids)) as last:
+            # Même filtre qu'à la lecture : un rappel réactivé entre-temps reste dans la collection principale
+            await self.hot.delete_many({**query, "id": {"$in": ids}})
+            remaining = await self.hot.find({"id": {"$in": ids}}, {"_id": 0, "id": 1}).to_list(None)
+            if remaining:
+                revived = {doc["id"] for doc in remaining}
+                await self.archive.delete_many({"id": {"$in": list(revived)}})
+                ids = [reminder_id for reminder_id in ids if reminder_id not in revived]
+            first = last - len(docs) + 1
+            tombstones = [
+                {"id": reminder_id, "seq": first + offset, "deleted_at": archived_at, "archived": True}
+                for offset, reminder_id in enumerate(ids)
+            ]
+            if tombstones:
+                await self.tombstones.insert_many(tombstones)
+
+        if tombstones and self.on_archived is not None:
+            await self.on_archived(tombstones)
+        self.archived += len(ids)
+        return len(ids)
+
+    async def run_once(self) -> int:
+        total = 0
+        while True:
+            moved = await self.archive_batch()
+            total += moved
+            if moved < self.batch_size:
+                break
+        self.runs += 1
+        if total:
+            logger.info(f"🗄️ Archived {total} completed/cancelled reminders")
+        return total
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Reminder archival failed: {str(e)}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def stats(self) -> dict:
+        return {"archived": self.archived, "runs": self.runs, "age_seconds": self.age_seconds}
@@ -0,0 +1,276 @@
+"""
+Déclenchement des rappels arrivés à échéance.
+
+Les rappels "scheduled" de la fenêtre à venir sont gardés dans un tas trié
+par échéance ; la boucle dort jusqu'à la prochaine échéance (ou jusqu'à ce
+qu'une écriture la réveille) au lieu d'interroger MongoDB. Les écritures
+arrivent par le bus d'événements et la fenêtre est rechargée périodiquement.
+Avant de déclencher un rappel, le worker prend un bail dans le document :
+un seul worker déclenche chaque échéance. Les rappels récurrents dont
+l'échéance a dépassé le retard maximal (service endormi) ne sont pas
+déclenchés : le rechargement les confie à `on_missed`, qui les avance à
+l'occurrence à venir pour que la série reprenne.
+"""
+import asyncio
+import heapq
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from recurrence import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+# Champs écrits par le planificateur, invisibles pour les clients
+SCHEDULER_FIELDS = frozenset(("lease_owner", "lease_until", "fired_for", "fired_at"))
+
+
+def due_timestamp(reminder: dict) -> Optional[float]:
+    """Échéance du rappel en secondes epoch, ou None si datetime_iso est illisible"""
+    try:
+        return parse_datetime(reminder["datetime_iso"], reminder.get("timezone")).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class ReminderScheduler:
+    def __init__(
+        self,
+        collection,
+        on_due: Callable[[dict], Awaitable[Optional[dict]]],
+        window_seconds: int = 3600,
+        lease_seconds: int = 60,
+        max_lateness_seconds: int = 86400,
+        on_written: Optional[Callable[[dict, dict, bool], Awaitable[None]]] = None,
+        on_missed: Optional[Callable[[dict], Awaitable[None]]] = None,
+    ):
+        self.collection = collection
+        self.on_due = on_due
+        # Appelé après l'écriture du déclenchement, réussie ou non : (rappel, champs de on_due, écrit)
+        self.on_written = on_written
+        # Appelé au rechargement pour chaque rappel récurrent trop en retard pour être déclenché
+        self.on_missed = on_missed
+        self.window_seconds = window_seconds
+        self.lease_seconds = lease_seconds
+        self.max_lateness_seconds = max_lateness_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        # Tas (échéance, datetime_iso, id) ; les entrées périmées sont ignorées au dépilage
+        self._heap: List[Tuple[float, str, str]] = []
+        self._pending: Dict[str, str] = {}
+        self._wake = asyncio.Event()
+        # Écritures reçues pendant un rechargement, rejouées ensuite
+        self._reload_backlog: Optional[List[dict]] = None
+        self._tasks = []
+        self._firing = set()
+        self.fired = 0
+        self.lost_claims = 0
+        self.reloads = 0
+        self.missed = 0
+
+    # Suivi des écritures
+
+    def track(self, reminder: dict):
+        """Ajoute, déplace ou retire un rappel après une création ou une modification"""
+        if self._reload_backlog is not None:
+            self._reload_backlog.append(reminder)
+        reminder_id = reminder.get("id")
+        due = due_timestamp(reminder)
+        now = time.time()
+        if (reminder.get("status") != "scheduled" or due is None
+                or not now - self.max_lateness_seconds <= due <= now + self.window_seconds):
+            self.untrack(reminder_id)
+            return
+        if self._pending.get(reminder_id) == reminder["datetime_iso"]:
+            return
+        self._pending[reminder_id] = reminder["datetime_iso"]
+        heapq.heappush(self._heap, (due, reminder["datetime_iso"], reminder_id))
+        self._wake.set()
+
+    def untrack(self, reminder_id: Optional[str]):
+        if self._reload_backlog is not None:
+            self._reload_backlog.append({"id": reminder_id})
+        self._pending.pop(reminder_id, None)
+
+    async def reload(self):
+        """Recharge la fenêtre des rappels à venir depuis MongoDB"""
+        now = time.time()
+        earliest = now - self.max_lateness_seconds
+        latest = now + self.window_seconds
+        # Parcours de l'index (status, due_at) ; due_at est la date UTC du rappel
+        query = {
+            "status": "scheduled",
+            "due_at": {"$gte": datetime.utcfromtimestamp(earliest), "$lte": datetime.utcfromtimestamp(latest)},
+        }
+        projection = {"_id": 0, "id": 1, "datetime_iso": 1, "timezone": 1, "fired_for": 1}
+        pending = {}
+        heap = []
+        self._reload_backlog = []
+        try:
+            async for doc in self.collection.find(query, projection):
+                due = due_timestamp(doc)
+                if due is None or not earliest <= due <= latest or doc.get("fired_for") == doc["datetime_iso"]:
+                    continue
+                pending[doc["id"]] = doc["datetime_iso"]
+                heap.append((due, doc["datetime_iso"], doc["id"]))
+        finally:
+            backlog, self._reload_backlog = self._reload_backlog, None
+        heapq.heapify(heap)
+        self._pending, self._heap = pending, heap
+        for reminder in backlog:
+            self.track(reminder)
+        self.reloads += 1
+        self._wake.set()
+        if self.on_missed is not None:
+            await self._catch_up(earliest)
+
+    async def _catch_up(self, earliest: float):
+        """Passe les rappels récurrents en retard au-delà de la fenêtre à leur occurrence à venir"""
+        query = {
+            "status": "scheduled",
+            "due_at": {"$lt": datetime.utcfromtimestamp(earliest)},
+            "recurrence": {"$nin": [None, ""]},
+        }
+        projection = {"_id": 0, "id": 1, "title": 1, "datetime_iso": 1, "timezone": 1, "recurrence": 1, "series_start": 1}
+        async for doc in self.collection.find(query, projection):
+            try:
+                await self.on_missed(doc)
+                self.missed += 1
+            except Exception as e:
+                logger.error(f"Failed to catch up reminder {doc.get('id')}: {str(e)}")
+
+    # Boucle principale
+
+    def start(self, events=None):
+        """Lance la boucle ; `events` est un abonnement au bus d'événements des rappels"""
+        self._wake = asyncio.Event()  # Lié à la boucle du serveur
+        self._tasks.append(asyncio.ensure_future(self._run()))
+        if events is not None:
+            self._tasks.append(asyncio.ensure_future(self._follow(events)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _follow(self, events):
+        while True:
+            event = await events.get()
+            kind = event.get("type")
+            if kind in ("created", "updated"):
+                self.track(event["reminder"])
+            elif kind == "deleted":
+                self.untrack(event["id"])
+            elif kind == "due":
+                # Récurrent : le rappel porte déjà l'occurrence suivante
+                reminder = event["reminder"]
+                if reminder.get("datetime_iso") == event.get("fired_for"):
+                    self.untrack(reminder.get("id"))
+                else:
+                    self.track(reminder)
+            elif kind == "resync":
+                await self.reload()
+
+    async def _run(self):
+        next_reload = 0.0
+        while True:
+            try:
+                if time.monotonic() >= next_reload:
+                    await self.reload()
+                    # Recharge à mi-fenêtre pour que le tas couvre toujours l'heure à venir
+                    next_reload = time.monotonic() + self.window_seconds / 2
+                self._fire_due()
+                timeout = next_reload - time.monotonic()
+                if self._heap:
+                    timeout = min(timeout, self._heap[0][0] - time.time())
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=max(timeout, 0))
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Reminder scheduler error: {str(e)}")
+                await asyncio.sleep(1)
+
+    def _fire_due(self):
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, datetime_iso, reminder_id = heapq.heappop(self._heap)
+            if self._pending.get(reminder_id) != datetime_iso:
+                continue  # Rappel modifié, supprimé ou déjà déclenché
+            del self._pending[reminder_id]
+            task = asyncio.ensure_future(self._fire(reminder_id, datetime_iso))
+            self._firing.add(task)
+            task.add_done_callback(self._firing.discard)
+        # Compacte le tas quand les entrées périmées dominent
+        if len(self._heap) > 2 * len(self._pending) + 1024:
+            self._heap = [entry for entry in self._heap if self._pending.get(entry[2]) == entry[1]]
+            heapq.heapify(self._heap)
+
+    async def _fire(self, reminder_id: str, datetime_iso: str):
+        now = datetime.utcnow()
+        try:
+            reminder = await self.collection.find_one_and_update(
+                {
+                    "id": reminder_id,
+                    "status": "scheduled",
+                    "datetime_iso": datetime_iso,
+                    "fired_for": {"$ne": datetime_iso},
+                    "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}],
+                },
+                {"$set": {"lease_owner": self.worker_id, "lease_until": now + timedelta(seconds=self.lease_seconds)}},
+                projection={"_id": 0},
+            )
+            if reminder is None:
+                self.lost_claims += 1  # Déclenché ailleurs, ou modifié entre-temps
+                return
+            # on_due peut renvoyer des champs à écrire avec le déclenchement (occurrence suivante)
+            advance = await self.on_due(reminder) or {}
+            update = {
+                "$set": {"fired_for": datetime_iso, "fired_at": now, **advance},
+                "$unset": {"lease_owner": "", "lease_until": ""},
+            }
+            if advance:
+                update["$inc"] = {"version": 1}
+            result = None
+            try:
+                result = await self.collection.update_one(
+                    {"id": reminder_id, "lease_owner": self.worker_id, "datetime_iso": datetime_iso}, update
+                )
+            finally:
+                # Publication seulement si l'écriture a eu lieu ; les ressources de on_due sont rendues dans tous les cas
+                if self.on_written is not None:
+                    await self.on_written(reminder, advance, result is not None and result.modified_count > 0)
+            if result.modified_count == 0:
+                # Modifié pendant le déclenchement : on rend le bail sans écraser la modification
+                await self.collection.update_one(
+                    {"id": reminder_id, "lease_owner": self.worker_id},
+                    {"$unset": {"lease_owner": "", "lease_until": ""}},
+                )
+            elif advance:
+                self.track({**reminder, **advance})
+            self.fired += 1
+        except Exception as e:
+            # Le bail expire et le rappel sera repris au prochain rechargement
+            logger.error(f"Failed to fire reminder {reminder_id}: {str(e)}")
+
+    def stats(self) -> dict:
+        next_due = None
+        while self._heap and self._pending.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+        if self._heap:
+            next_due = round(max(self._heap[0][0] - time.time(), 0), 3)
+        return {
+            "worker_id": self.worker_id,
+            "pending": len(self._pending),
+            "next_due_in_seconds": next_due,
+            "fired": self.fired,
+            "lost_claims": self.lost_claims,
+            "reloads": self.reloads,
+            "missed": self.missed,
+        }
@@ -1,18 +1,48 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Body, Header, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from dotenv import load_dotenv
+from fastapi.responses import StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, ValidationError, field_validator
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
 import uuid
-from datetime import datetime
+import time
+import base64
+import hashlib
+import json
+import random
+from datetime import datetime, timedelta
 from openai import AsyncOpenAI
+import pytz
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
 import sys
 
+from admission import AdmissionController, AdmissionRejected, current_client
+from french_parser import DAYS_FR, MONTHS_FR, parse_french_reminder, parse_slot_date, parse_slot_time, task_title
+from llm_resilience import ResilientCaller, UpstreamUnavailableError, deadline_budget, remaining_budget
+from model_router import ModelRouter
+from chat_detector import DATE_ANSWER_WORDS, MessageSignals, detect
+from parse_cache import ParseCache
+from rate_limit import MemoryBucketStore, MongoBucketStore, RateLimited, RateLimiter, TokenBucketPolicy
+from recurrence import next_occurrence, occurrences, parse_datetime, parse_rule
+from reminder_archiver import ReminderArchiver
+from reminder_scheduler import SCHEDULER_FIELDS, ReminderScheduler
+from singleflight import SingleFlight
+from change_version import ChangeVersion
+from chat_stream import JSONFieldStream, sse_event
+from event_bus import EventBus
+from fast_json import FastJSONResponse, dumps
+from session_store import ChatSession, SessionStore
+from upcoming_cache import UpcomingCache
+from versioned_cache import VersionedCache
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
@@ -47,24 +77,333 @@ api_router = APIRouter(prefix="/api")
 
 
 # Initialize OpenAI client
-openai_client = AsyncOpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
+# Retries are handled by openai_resilience, not by the client; the client timeout also bounds each streamed chunk
+OPENAI_TIMEOUT_SECONDS = float(os.environ.get('OPENAI_TIMEOUT_SECONDS', '20'))
+openai_client = AsyncOpenAI(api_key=os.environ.get('OPENAI_API_KEY'), max_retries=0, timeout=OPENAI_TIMEOUT_SECONDS)
+
+# Total time a request may spend on the LLM (admission wait, attempts, backoff and model tiers),
+# kept below the frontend's 60 s axios timeout so the degraded answer still reaches the client
+LLM_TOTAL_BUDGET_SECONDS = float(os.environ.get('LLM_TOTAL_BUDGET_SECONDS', '45'))
+
+# Deadlines, jittered retries, hedged requests and circuit breaker around OpenAI calls
+openai_resilience = ResilientCaller(
+    timeout_seconds=OPENAI_TIMEOUT_SECONDS,
+    max_attempts=int(os.environ.get('OPENAI_MAX_ATTEMPTS', '3')),
+    backoff_seconds=float(os.environ.get('OPENAI_RETRY_BACKOFF_SECONDS', '0.5')),
+    hedge_quantile=float(os.environ.get('OPENAI_HEDGE_QUANTILE', '0.95')),
+    failure_threshold=int(os.environ.get('OPENAI_BREAKER_THRESHOLD', '5')),
+    reset_seconds=float(os.environ.get('OPENAI_BREAKER_RESET_SECONDS', '30')),
+)
+
+# Reference timezone for relative dates ("demain", "lundi")
+PARIS_TZ = pytz.timezone('Europe/Paris')
+
+# Minimum confidence for the local French parser to answer without calling OpenAI
+LOCAL_PARSE_MIN_CONFIDENCE = float(os.environ.get('LOCAL_PARSE_MIN_CONFIDENCE', '0.8'))
+
+# Two-tier cache (in-process LRU + Mongo TTL collection) of OpenAI parse results
+parse_cache = ParseCache(
+    db.parse_cache,
+    max_entries=int(os.environ.get('PARSE_CACHE_MAX_ENTRIES', '1024')),
+    ttl_seconds=int(os.environ.get('PARSE_CACHE_TTL_SECONDS', '86400')),
+)
+
+# In-flight registry coalescing identical concurrent OpenAI parse calls
+llm_flights = SingleFlight()
+
+# OpenAI parse models, cheapest first; a tier's answer is kept unless it must escalate
+PARSE_MODELS = [model.strip() for model in os.environ.get('PARSE_MODELS', 'gpt-4o-mini,gpt-4o').split(',') if model.strip()]
+parse_router = ModelRouter(PARSE_MODELS, passthrough=(UpstreamUnavailableError,))
+
+# Admission control of OpenAI parse calls: concurrency cap, bounded fair queue, 503 when saturated
+llm_admission = AdmissionController(
+    max_concurrency=int(os.environ.get('LLM_MAX_CONCURRENCY', '8')),
+    max_queue=int(os.environ.get('LLM_QUEUE_MAX', '64')),
+    max_queue_per_client=int(os.environ.get('LLM_QUEUE_MAX_PER_CLIENT', '8')),
+    max_wait_seconds=float(os.environ.get('LLM_QUEUE_WAIT_SECONDS', '10')),
+)
+
+# Largest page served by GET /api/reminders
+REMINDERS_PAGE_MAX = int(os.environ.get('REMINDERS_PAGE_MAX', '1000'))
+
+# Largest list accepted by POST /api/reminders/bulk
+REMINDERS_BULK_MAX = int(os.environ.get('REMINDERS_BULK_MAX', '100'))
+
+# Server-side chat sessions, persisted in Mongo so a restart or another worker keeps the
+# conversation (CHAT_SESSION_PERSIST=0 keeps them in memory only)
+chat_sessions = SessionStore(
+    db.chat_sessions if os.environ.get('CHAT_SESSION_PERSIST', '1').lower() in ('1', 'true') else None,
+    ttl_seconds=int(os.environ.get('CHAT_SESSION_TTL_SECONDS', '3600')),
+    max_sessions=int(os.environ.get('CHAT_SESSION_MAX', '10000')),
+)
+
+# Real-time reminder events pushed to /api/ws clients
+reminder_events = EventBus(queue_size=int(os.environ.get('REMINDER_EVENTS_QUEUE_SIZE', '100')))
+REMINDER_EVENTS_CHANGE_STREAM = os.environ.get('REMINDER_EVENTS_CHANGE_STREAM', '1').lower() in ('1', 'true')
+
+# Due-reminder scheduler (window of upcoming reminders kept in memory)
+SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', '1').lower() in ('1', 'true')
+SCHEDULER_WINDOW_SECONDS = int(os.environ.get('SCHEDULER_WINDOW_SECONDS', '3600'))
+SCHEDULER_LEASE_SECONDS = int(os.environ.get('SCHEDULER_LEASE_SECONDS', '60'))
+SCHEDULER_MAX_LATENESS_SECONDS = int(os.environ.get('SCHEDULER_MAX_LATENESS_SECONDS', '86400'))
+SCHEDULER_QUEUE_SIZE = int(os.environ.get('SCHEDULER_QUEUE_SIZE', '10000'))
+
+# Agenda (reminders bucketed per local day), cached per collection version
+REMINDER_STATUSES = ("scheduled", "completed", "cancelled")
+AGENDA_DEFAULT_DAYS = int(os.environ.get('AGENDA_DEFAULT_DAYS', '7'))
+AGENDA_MAX_DAYS = int(os.environ.get('AGENDA_MAX_DAYS', '366'))
+agenda_cache = VersionedCache(max_entries=int(os.environ.get('AGENDA_CACHE_MAX_ENTRIES', '256')))
+
+# Archival of completed / cancelled reminders into reminders_archive
+ARCHIVE_ENABLED = os.environ.get('ARCHIVE_ENABLED', '1').lower() in ('1', 'true')
+TERMINAL_STATUSES = ("completed", "cancelled")
+
+# In-memory upcoming window, serves scheduled range reads of GET /api/reminders
+UPCOMING_CACHE_ENABLED = os.environ.get('UPCOMING_CACHE_ENABLED', '1').lower() in ('1', 'true')
+
+# Per-client token buckets (shared through Mongo for multi-worker runs): every API request
+# takes a "crud" token in the middleware, every OpenAI call actually made an "llm" token
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1').lower() in ('1', 'true')
+# Reverse proxies in front of the app (Render's ingress), each appending one X-Forwarded-For hop
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', '1'))
+rate_limiter = RateLimiter(
+    MongoBucketStore(db.rate_limits) if os.environ.get('RATE_LIMIT_BACKEND', 'memory') == 'mongo'
+    else MemoryBucketStore(max_buckets=int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', '10000'))),
+    [
+        TokenBucketPolicy("llm", float(os.environ.get('RATE_LIMIT_LLM_PER_MINUTE', '30')) / 60,
+                          int(os.environ.get('RATE_LIMIT_LLM_BURST', '10'))),
+        TokenBucketPolicy("crud", float(os.environ.get('RATE_LIMIT_CRUD_PER_MINUTE', '600')) / 60,
+                          int(os.environ.get('RATE_LIMIT_CRUD_BURST', '100'))),
+    ],
+)
+
+# Batch parsing limits
+PARSE_BATCH_MAX_ITEMS = int(os.environ.get('PARSE_BATCH_MAX_ITEMS', '100'))
+PARSE_BATCH_CONCURRENCY = int(os.environ.get('PARSE_BATCH_CONCURRENCY', '4'))
 
 
 # Database initialization
+async def drop_legacy_indexes():
+    """Drop reminder indexes replaced by newer definitions (before creating those)"""
+    try:
+        existing = await db.reminders.index_information()
+        # String-sorted indexes (original ones, then their paginated versions), replaced by the due_at ones
+        for legacy in ("datetime_iso_1", "status_1_datetime_iso_1", "datetime_iso_1_id_1", "status_1_datetime_iso_1_id_1"):
+            if legacy in existing:
+                await db.reminders.drop_index(legacy)
+        # Full status index, replaced by the partial one on scheduled reminders
+        status_index = existing.get("status_1_due_at_1_id_1")
+        if status_index is not None and "partialFilterExpression" not in status_index:
+            await db.reminders.drop_index("status_1_due_at_1_id_1")
+    except Exception as e:
+        logger.warning(f"Legacy index cleanup failed: {str(e)}")
+
+
 async def init_db_indexes():
     """Initialize database indexes on startup"""
+    await drop_legacy_indexes()
     try:
         # Create unique index on 'id' field
         await db.reminders.create_index([("id", 1)], unique=True)
-        # Create index on 'datetime_iso' for sorting
-        await db.reminders.create_index([("datetime_iso", 1)])
-        # Create compound index for filtered queries
-        await db.reminders.create_index([("status", 1), ("datetime_iso", 1)])
+        # Create index on 'due_at' (UTC) for sorting and range scans ('id' breaks ties for keyset pagination)
+        await db.reminders.create_index([("due_at", 1), ("id", 1)])
+        # Scheduled reminders only: scheduler, upcoming cache and status=scheduled lists
+        await db.reminders.create_index(
+            [("status", 1), ("due_at", 1), ("id", 1)],
+            partialFilterExpression={"status": "scheduled"}
+        )
+        # Delta sync: per-document change sequence and deletion tombstones
+        await db.reminders.create_index([("seq", 1)])
+        await db.reminder_tombstones.create_index([("seq", 1)])
+        # TTL index expiring persisted parse results
+        await parse_cache.ensure_indexes()
+        await chat_sessions.ensure_indexes()
+        await reminder_archiver.ensure_indexes()
+        # TTL index expiring the token buckets of idle clients (Mongo backend)
+        await rate_limiter.ensure_indexes()
         logger.info("✅ Database indexes initialized successfully")
     except Exception as e:
         logger.warning(f"Index creation warning (may already exist): {str(e)}")
 
 
+# Change version of the reminders collection. Every write reserves its `seq`
+# (what GET /api/reminders/changes pages on) before writing and releases it after;
+# readers only see the committed version, never a seq whose write is still in flight.
+# Keyed per collection for now; the key can become per-user later.
+reminders_version = ChangeVersion(
+    db.counters,
+    "reminders",
+    pending_timeout_seconds=float(os.environ.get('REMINDERS_SEQ_PENDING_TIMEOUT_SECONDS', '30')),
+    # Reads reuse the version for this long; this worker's own writes refresh it at once
+    max_age_seconds=float(os.environ.get('REMINDERS_VERSION_MAX_AGE_SECONDS', '1')),
+)
+
+
+async def get_reminders_version() -> int:
+    """Committed version for ETags and caches, at most REMINDERS_VERSION_MAX_AGE_SECONDS behind other workers"""
+    return await reminders_version.current()
+
+
+def to_due_at(datetime_iso: str, timezone: Optional[str] = None) -> datetime:
+    """UTC instant of a reminder, stored as a BSON date in `due_at` (ValueError if unreadable)"""
+    return parse_datetime(datetime_iso, timezone).astimezone(pytz.utc).replace(tzinfo=None)
+
+
+def _llm_datetime_iso(datetime_iso: Optional[str], timezone: Optional[str]) -> Optional[str]:
+    """Recompute the offset of a model-produced datetime_iso from the timezone rules.
+
+    The model gets the wall-clock time right but not always the DST offset of the target date.
+    """
+    try:
+        wall_clock = datetime.fromisoformat(datetime_iso).replace(tzinfo=None)
+        return pytz.timezone(timezone or "Europe/Paris").localize(wall_clock).isoformat()
+    except (TypeError, ValueError, pytz.UnknownTimeZoneError):
+        return datetime_iso
+
+
+# Write notifications, called by the reminder routes after each successful write
+def notify_reminder_change(event: dict):
+    agenda_cache.clear()
+    upcoming_cache.apply(event)
+    reminder_events.emit(event)
+
+
+def _reminder_event(kind: str, seq: int, reminder: dict) -> dict:
+    return {"type": kind, "seq": seq, "reminder": {name: reminder.get(name) for name in Reminder.model_fields}}
+
+
+def _deleted_event(seq: int, reminder_id: str) -> dict:
+    return {"type": "deleted", "seq": seq, "id": reminder_id}
+
+
+def _watch_reminder_changes(resume_token):
+    pipeline = [{"$match": {
+        "ns.coll": {"$in": ["reminders", "reminder_tombstones"]},
+        "operationType": {"$in": ["insert", "update", "replace"]}
+    }}]
+    return db.watch(pipeline, full_document="updateLookup", resume_after=resume_token)
+
+
+def _event_from_change(change: dict) -> Optional[dict]:
+    doc = change.get("fullDocument")
+    if doc is None:
+        # Updated then deleted before the lookup; the tombstone event follows
+        return None
+    if change["ns"]["coll"] == "reminder_tombstones":
+        return _deleted_event(doc["seq"], doc["id"])
+    if change["operationType"] == "update":
+        updated = change.get("updateDescription", {})
+        touched = set(updated.get("updatedFields", {})) | set(updated.get("removedFields", []))
+        if "fired_for" in touched:
+            return {**_reminder_event("due", doc.get("seq"), doc), "fired_for": doc["fired_for"]}
+        if touched <= SCHEDULER_FIELDS:
+            # Scheduler lease bookkeeping, invisible to clients
+            return None
+    kind = "created" if change["operationType"] == "insert" else "updated"
+    return _reminder_event(kind, doc.get("seq"), doc)
+
+
+async def _next_occurrence_fields(reminder: dict) -> Optional[dict]:
+    """Fields moving a recurring reminder to its next occurrence, None when the series is over"""
+    try:
+        rule = parse_rule(reminder.get("recurrence"))
+        if rule is None:
+            return None
+        timezone = reminder.get("timezone") or "Europe/Paris"
+        series_start = reminder.get("series_start") or reminder["datetime_iso"]
+        # Occurrences missed while the service was down are skipped
+        after = max(parse_datetime(reminder["datetime_iso"], timezone), datetime.now(pytz.utc))
+        upcoming = next_occurrence(rule, parse_datetime(series_start, timezone), timezone, after)
+    except (ValueError, pytz.UnknownTimeZoneError) as e:
+        logger.warning(f"Recurrence ignored for reminder {reminder['id']}: {str(e)}")
+        return None
+    if upcoming is None:
+        return None
+    return {
+        "datetime_iso": upcoming.isoformat(),
+        "due_at": upcoming.astimezone(pytz.utc).replace(tzinfo=None),
+        "series_start": series_start,
+        # Released once the scheduler's completion write is done (_on_reminder_fired)
+        "seq": await reminders_version.allocate(),
+        "updated_at": datetime.utcnow().isoformat(),
+    }
+
+
+async def _on_reminder_due(reminder: dict) -> Optional[dict]:
+    logger.info(f"⏰ Reminder due: {reminder['id']} ({reminder.get('title')})")
+    # Only the next occurrence of a recurring reminder is ever stored
+    return await _next_occurrence_fields(reminder)
+
+
+async def _release_advance_seq(advance: dict):
+    await reminders_version.release([advance["seq"]])
+
+
+async def _on_reminder_fired(reminder: dict, advance: dict, written: bool):
+    """Completion write attempted: release the seq, then publish only what was actually stored"""
+    if advance:
+        await _release_advance_seq(advance)
+    if not written:
+        # Edited or deleted while firing: that write's own event is the one clients must see
+        return
+    current = reminder
+    if advance:
+        current = {**reminder, **advance, "version": reminder.get("version", 0) + 1}
+    event = _reminder_event("due", current.get("seq"), current)
+    notify_reminder_change({**event, "fired_for": reminder["datetime_iso"]})
+
+
+async def _on_reminder_missed(reminder: dict):
+    """Recurring reminder overdue past the lateness window (service asleep): move it
+    to its upcoming occurrence without firing, so the series resumes"""
+    advance = await _next_occurrence_fields(reminder)
+    if not advance:
+        return
+    try:
+        doc = await db.reminders.find_one_and_update(
+            # Guarded on the overdue occurrence: another worker or an edit may have moved it already
+            {"id": reminder["id"], "status": "scheduled", "datetime_iso": reminder["datetime_iso"]},
+            {"$set": advance, "$inc": {"version": 1}},
+            projection=REMINDER_PROJECTION,
+            return_document=ReturnDocument.AFTER
+        )
+    finally:
+        await _release_advance_seq(advance)
+    if doc is not None:
+        logger.info(f"⏭️ Missed occurrences skipped for reminder {reminder['id']}, next on {advance['datetime_iso']}")
+        notify_reminder_change(_reminder_event("updated", advance["seq"], doc))
+
+
+reminder_scheduler = ReminderScheduler(
+    db.reminders,
+    _on_reminder_due,
+    window_seconds=SCHEDULER_WINDOW_SECONDS,
+    lease_seconds=SCHEDULER_LEASE_SECONDS,
+    max_lateness_seconds=SCHEDULER_MAX_LATENESS_SECONDS,
+    on_written=_on_reminder_fired,
+    on_missed=_on_reminder_missed,
+)
+
+
+async def _on_reminders_archived(tombstones: List[dict]):
+    # Archived reminders leave the collection: same events as deletions
+    for tombstone in tombstones:
+        notify_reminder_change(_deleted_event(tombstone["seq"], tombstone["id"]))
+
+
+reminder_archiver = ReminderArchiver(
+    db.reminders,
+    db.reminders_archive,
+    db.reminder_tombstones,
+    reminders_version,
+    statuses=TERMINAL_STATUSES,
+    age_seconds=int(os.environ.get('ARCHIVE_AFTER_DAYS', '30')) * 86400,
+    batch_size=int(os.environ.get('ARCHIVE_BATCH_SIZE', '500')),
+    interval_seconds=int(os.environ.get('ARCHIVE_INTERVAL_SECONDS', '3600')),
+    on_archived=_on_reminders_archived,
+)
+
+
 # Helper function to convert ObjectId
 def str_object_id(obj):
     if isinstance(obj, dict):
@@ -87,6 +426,19 @@ class ParsedReminder(BaseModel):
     is_ambiguous: bool = False
     ambiguity_reason: Optional[str] = None
 
+class BatchParseRequest(BaseModel):
+    messages: List[str] = Field(..., min_length=1, max_length=PARSE_BATCH_MAX_ITEMS)
+    max_concurrency: Optional[int] = Field(None, ge=1)
+
+class BatchParseItem(BaseModel):
+    index: int
+    message: str
+    parsed: Optional[ParsedReminder] = None
+    error: Optional[str] = None
+
+class BatchParseResponse(BaseModel):
+    results: List[BatchParseItem]
+
 class ReminderCreate(BaseModel):
     title: str
     description: Optional[str] = None
@@ -94,6 +446,16 @@ class ReminderCreate(BaseModel):
     timezone: str = "Europe/Paris"
     recurrence: Optional[str] = None
 
+    @field_validator("timezone")
+    @classmethod
+    def _known_timezone(cls, value: str) -> str:
+        # Stored zones feed $dateToString and the recurrence engine: an unknown one would break them later
+        try:
+            pytz.timezone(value)
+        except pytz.UnknownTimeZoneError:
+            raise ValueError(f"fuseau horaire inconnu: {value}")
+        return value
+
 class Reminder(BaseModel):
     id: str
     title: str
@@ -104,6 +466,52 @@ class Reminder(BaseModel):
     recurrence: Optional[str] = None
     created_at: str
     updated_at: str
+    version: int = 0  # Incremented on every update; 0 for reminders created before versioning
+
+# Only the public Reminder fields are read back from Mongo (no _id, no internal fields)
+REMINDER_PROJECTION = {"_id": 0, **{name: 1 for name in Reminder.model_fields}}
+
+# Scheduled reminders of the upcoming window, held in memory for range reads
+upcoming_cache = UpcomingCache(
+    db.reminders,
+    Reminder.model_fields,
+    lookback_seconds=int(os.environ.get('UPCOMING_CACHE_LOOKBACK_SECONDS', '86400')),
+    window_seconds=int(os.environ.get('UPCOMING_CACHE_WINDOW_SECONDS', '172800')),
+    reconcile_seconds=int(os.environ.get('UPCOMING_CACHE_RECONCILE_SECONDS', '60')),
+    max_entries=int(os.environ.get('UPCOMING_CACHE_MAX_ENTRIES', '50000')),
+)
+
+class BulkCreateItem(BaseModel):
+    index: int
+    reminder: Optional[Reminder] = None
+    error: Optional[str] = None
+
+class BulkCreateResponse(BaseModel):
+    results: List[BulkCreateItem]
+
+class ReminderChanges(BaseModel):
+    version: int  # Pass back as `since` on the next sync
+    changed: List[Reminder]
+    deleted: List[str]
+    has_more: bool
+
+class AgendaDay(BaseModel):
+    date: str  # Local day (YYYY-MM-DD) in each reminder's own timezone
+    total: int
+    counts: Dict[str, int]
+    reminders: List[Reminder]  # Truncated to `per_day` when given
+
+class Agenda(BaseModel):
+    start: str
+    end: str
+    days: List[AgendaDay]
+    counts: Dict[str, int]
+
+class ReminderOccurrences(BaseModel):
+    id: str
+    recurrence: Optional[str] = None
+    occurrences: List[str]
+    has_more: bool
 
 class ReminderUpdate(BaseModel):
     title: Optional[str] = None
@@ -111,9 +519,11 @@ class ReminderUpdate(BaseModel):
     datetime_iso: Optional[str] = None
     status: Optional[str] = None
     recurrence: Optional[str] = None
+    expected_version: Optional[int] = None  # Optimistic concurrency: 409 if the reminder changed
 
 class ChatRequest(BaseModel):
     message: str
+    session_id: Optional[str] = None  # Returned by /api/chat; replaces conversation_history
     conversation_history: Optional[List[dict]] = []
 
 class ChatResponse(BaseModel):
@@ -121,37 +531,21 @@ class ChatResponse(BaseModel):
     type: str  # "question", "suggestion", "confirmation", "multiple_tasks"
     suggestions: Optional[List[str]] = None
     parsed_reminders: Optional[List[ParsedReminder]] = None
+    session_id: Optional[str] = None
 
 
 # NLU Parsing Service with OpenAI
-async def parse_natural_language_message(message: str) -> ParsedReminder:
-    """Parse a natural language message to extract reminder information"""
-    try:
-        from datetime import datetime, timedelta
-        import json
-        import re
-        
-        import pytz
-        
-        # Use Paris timezone for context
-        paris_tz = pytz.timezone('Europe/Paris')
-        today = datetime.now(paris_tz)
-        
-        # Manual French date formatting to ensure consistency
-        months_fr = {
-            1: "janvier", 2: "février", 3: "mars", 4: "avril", 5: "mai", 6: "juin",
-            7: "juillet", 8: "août", 9: "septembre", 10: "octobre", 11: "novembre", 12: "décembre"
-        }
-        days_fr = {
-            0: "lundi", 1: "mardi", 2: "mercredi", 3: "jeudi", 4: "vendredi", 5: "samedi", 6: "dimanche"
-        }
-        
-        day_name = days_fr[today.weekday()]
-        month_name = months_fr[today.month]
-        today_str = f"{day_name} {today.day} {month_name} {today.year}"
-        now_str = today.strftime("%H:%M")
-        
-        system_prompt = f"""Tu es un expert en extraction d'informations de rappels en français.
+def _parse_prompt_messages(message: str, today: datetime) -> List[dict]:
+    """Build the OpenAI messages for parsing a reminder relative to `today`"""
+    # Manual French date formatting to ensure consistency
+    day_name = DAYS_FR[today.weekday()]
+    month_name = MONTHS_FR[today.month]
+    today_str = f"{day_name} {today.day} {month_name} {today.year}"
+    now_str = today.strftime("%H:%M")
+    offset = today.strftime("%z")
+    offset = f"{offset[:3]}:{offset[3:]}"
+    
+    system_prompt = f"""Tu es un expert en extraction d'informations de rappels en français.
 
 
 
@@ -166,6 +560,7 @@ Analyser le message utilisateur pour extraire un rappel.
 RÈGLES DE DATE:
 1. Si l'utilisateur dit "30 novembre", tu DOIS utiliser l'année {today.year}.
 2. "Demain" = {today_str} + 1 jour.
+3. Le décalage horaire de "datetime_iso" est celui de Paris À LA DATE DU RAPPEL : +01:00 en hiver, +02:00 en été (aujourd'hui {offset}).
 
 EXEMPLES:
 - User: "Rdv 30 novembre 14h medecin"
@@ -179,32 +574,152 @@ FORMAT DE RÉPONSE (JSON PUR):
   "description": null,
   "date": "YYYY-MM-DD",
   "time": "HH:MM",
-  "datetime_iso": "YYYY-MM-DDTHH:MM:00+01:00",
+  "datetime_iso": "YYYY-MM-DDTHH:MM:00{offset}",
   "timezone": "Europe/Paris",
   "is_ambiguous": false,
   "ambiguity_reason": null
 }}"""
-        
-        user_prompt = f"""Message: "{message}"
+    
+    user_prompt = f"""Message: "{message}"
 
 JSON:"""
-        
-        response = await openai_client.chat.completions.create(
-            model="gpt-4o",  # Utilisation du modèle le plus performant
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
+    
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def _parse_inconsistency(parsed: ParsedReminder) -> Optional[str]:
+    """Why the date / time / datetime_iso fields of a parse disagree, or None"""
+    if parsed.is_ambiguous:
+        return None
+    if not parsed.datetime_iso:
+        return "missing datetime_iso"
+    try:
+        moment = datetime.fromisoformat(parsed.datetime_iso)
+    except ValueError:
+        return "invalid datetime_iso"
+    if parsed.date and parsed.date != moment.date().isoformat():
+        return "date mismatch"
+    if parsed.time and parsed.time != moment.strftime("%H:%M"):
+        return "time mismatch"
+    return None
+
+
+def _validate_parse(response_text: str) -> Tuple[Optional[ParsedReminder], Optional[str]]:
+    """Model answer -> (ParsedReminder or None, escalation reason or None)"""
+    try:
+        parsed_data = json.loads(response_text)
+        parsed = ParsedReminder(**parsed_data)
+    except json.JSONDecodeError:
+        return None, "invalid_json"
+    except (TypeError, ValidationError):
+        return None, "invalid_fields"
+    if parsed.is_ambiguous:
+        return parsed, "ambiguous"
+    if _parse_inconsistency(parsed):
+        return parsed, "inconsistent"
+    return parsed, None
+
+
+async def _charge_llm_call():
+    """One "llm" token per OpenAI call actually made; local parses and cache hits are free"""
+    if not RATE_LIMIT_ENABLED:
+        return
+    allowed, retry_after = await rate_limiter.check("llm", current_client.get())
+    if not allowed:
+        raise RateLimited("llm", retry_after)
+
+
+async def _parse_with_openai(message: str, today: datetime, cache_key: Optional[str]) -> ParsedReminder:
+    """OpenAI parse through the model tiers; the result is stored in the parse cache"""
+    async def call(model: str) -> str:
+        response = await openai_resilience.call(lambda: openai_client.chat.completions.create(
+            model=model,
+            messages=_parse_prompt_messages(message, today),
             temperature=0.1,
             response_format={"type": "json_object"}
-        )
-        
+        ))
         response_text = response.choices[0].message.content.strip()
-        logger.info(f"OpenAI Response: {response_text}")
+        logger.info(f"OpenAI Response ({model}): {response_text}")
+        return response_text
+    
+    # Cache hits and the local parser never get here, so they never wait for a slot.
+    # A batch request may already have set a closer deadline for all its messages
+    with deadline_budget(LLM_TOTAL_BUDGET_SECONDS):
+        await _charge_llm_call()
+        async with llm_admission.slot(current_client.get(), max_wait=remaining_budget()):
+            started = time.monotonic()
+            try:
+                parsed = await parse_router.run(call, _validate_parse)
+            finally:
+                parse_cache.record_llm_call(time.monotonic() - started)
+    
+    if parsed.datetime_iso:
+        parsed.datetime_iso = _llm_datetime_iso(parsed.datetime_iso, parsed.timezone)
+    if cache_key:
+        await parse_cache.set(cache_key, parsed.dict())
+    return parsed
+
+
+async def _parse_without_llm(message: str, today: datetime) -> Tuple[Optional[ParsedReminder], Optional[str]]:
+    """Try the local parser then the parse cache; returns (result or None, cache key)"""
+    # Fast path: deterministic parser for the common patterns
+    local = parse_french_reminder(message, today)
+    if local and local.confidence >= LOCAL_PARSE_MIN_CONFIDENCE:
+        logger.info(f"Local parse (confidence {local.confidence:.2f}): {local.title}")
+        return ParsedReminder(**local.reminder_fields()), None
+    
+    # The reference date is part of the key since "demain" depends on today
+    cache_key = ParseCache.make_key(message, today.date().isoformat())
+    if cache_key:
+        cached = await parse_cache.get(cache_key)
+        if cached is not None:
+            return ParsedReminder(**cached), cache_key
+    return None, cache_key
+
+
+def _degraded_parse(message: str, today: datetime) -> ParsedReminder:
+    """Best local parse when OpenAI is unavailable; always flagged for confirmation, never cached"""
+    openai_resilience.record_fallback()
+    local = parse_french_reminder(message, today)
+    if local is None:
+        return ParsedReminder(
+            title=message.strip(),
+            is_ambiguous=True,
+            ambiguity_reason="Analyse indisponible pour le moment : précise la date et l'heure"
+        )
+    fields = local.reminder_fields()
+    if not fields["is_ambiguous"]:
+        fields["is_ambiguous"] = True
+        fields["ambiguity_reason"] = "Analyse simplifiée (service indisponible) : vérifie la date et l'heure"
+    return ParsedReminder(**fields)
+
+
+async def _parse_with_llm(message: str, today: datetime, cache_key: Optional[str]) -> ParsedReminder:
+    # Concurrent identical requests (client retries, double taps) share one OpenAI call
+    flight_key = cache_key or f"{today.strftime('%Y-%m-%dT%H:%M')}|{' '.join(message.lower().split())}"
+    try:
+        return await llm_flights.do(flight_key, lambda: _parse_with_openai(message, today, cache_key))
+    except UpstreamUnavailableError as e:
+        logger.warning(f"OpenAI unavailable, degraded local parse: {str(e)}")
+        return _degraded_parse(message, today)
+
+
+async def parse_natural_language_message(message: str) -> ParsedReminder:
+    """Parse a natural language message to extract reminder information"""
+    try:
+        # Use Paris timezone for context
+        today = datetime.now(PARIS_TZ)
         
-        parsed_data = json.loads(response_text)
-        return ParsedReminder(**parsed_data)
+        parsed, cache_key = await _parse_without_llm(message, today)
+        if parsed is not None:
+            return parsed
+        return await _parse_with_llm(message, today, cache_key)
         
+    except (AdmissionRejected, RateLimited):
+        raise
     except json.JSONDecodeError as e:
         logger.error(f"JSON decode error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erreur JSON: {str(e)}")
@@ -214,182 +729,343 @@ JSON:"""
 
 
 # Intelligent Chatbot Service for ADHD users
-async def intelligent_chat_assistant(message: str, history: List[dict] = []) -> ChatResponse:
-    """Assistant IA conversationnel pour aider les utilisateurs TDAH"""
-    try:
-        logger.info(f"📨 Message reçu: '{message}'")
-        logger.info(f"📚 Historique ({len(history)} messages): {history}")
-        llm_key = os.environ.get('EMERGENT_LLM_KEY')
-        if not llm_key:
-            raise ValueError("EMERGENT_LLM_KEY not found in environment")
-        
-        from datetime import datetime, timedelta
-        import json
-        import re
-        import pytz
-        
-        paris_tz = pytz.timezone('Europe/Paris')
-        today = datetime.now(paris_tz)
-        
-        # Manual French date formatting
-        months_fr = {
-            1: "janvier", 2: "février", 3: "mars", 4: "avril", 5: "mai", 6: "juin",
-            7: "juillet", 8: "août", 9: "septembre", 10: "octobre", 11: "novembre", 12: "décembre"
-        }
-        days_fr = {
-            0: "lundi", 1: "mardi", 2: "mercredi", 3: "jeudi", 4: "vendredi", 5: "samedi", 6: "dimanche"
-        }
-        
-        day_name = days_fr[today.weekday()]
-        month_name = months_fr[today.month]
-        today_str = f"{day_name} {today.day} {month_name} {today.year}"
+@dataclass
+class ChatPlan:
+    """Outcome of the chat heuristics: either a final response, or a message still to parse"""
+    response: Optional[ChatResponse] = None
+    parse_message: Optional[str] = None
+    encouragements: List[str] = field(default_factory=list)
+    labelled: bool = False
+    parsed: Optional[ParsedReminder] = None  # Already filled locally from the session, no parse needed
 
-        now_str = today.strftime("%H:%M")
-        tomorrow = (today + timedelta(days=1)).strftime("%Y-%m-%d")
-        
-        # Reconstruct context from history
-        context_info = {
-            "task": None,
-            "date": None,
-            "time": None,
-            "waiting_for": None
-        }
-        
-        # Parse history to understand what we're waiting for
-        if history:
-            last_messages = history[-4:]  # Last 4 messages
-            full_context = " ".join([h.get('content', '') for h in last_messages])
-            
-            # Extract task from first user message
-            for h in history:
-                if h.get('role') == 'user':
-                    # Extract potential task name
-                    task_words = h.get('content', '').lower()
-                    if any(word in task_words for word in ['rappel', 'appel', 'rdv', 'rendez-vous', 'médecin', 'dentiste', 'courses']):
-                        context_info["task"] = h.get('content', '')
-                        break
-            
-            # Check if we asked for date or time
-            for h in reversed(history[-2:]):
-                content = h.get('content', '').lower()
-                if 'manque la date' in content or 'quelle date' in content or 'c\'est quand' in content:
-                    context_info["waiting_for"] = "date"
-                elif 'manque l\'heure' in content or 'quelle heure' in content or 'à quelle heure' in content:
-                    context_info["waiting_for"] = "time"
-                
-                # Extract date if present
-                if 'demain' in content:
-                    context_info["date"] = tomorrow
-                elif re.search(r'\d{4}-\d{2}-\d{2}', content):
-                    date_match = re.search(r'\d{4}-\d{2}-\d{2}', content)
-                    context_info["date"] = date_match.group(0)
-        
-        # If user is answering with just time (like "14h")
-        if context_info["waiting_for"] == "time" and re.match(r'^\d{1,2}h?\d{0,2}$', message.strip()):
-            # User is giving just the time
-            time_str = message.strip()
-            if not 'h' in time_str and not ':' in time_str:
-                time_str = time_str + "h00"
-            elif 'h' in time_str and len(time_str.split('h')[1]) == 0:
-                time_str = time_str + "00"
-            
-            # Reconstruct full message with task, date AND time
-            if context_info["task"] and context_info["date"]:
-                # We have all info: task + date + time
-                full_message = f"{context_info['task']} {context_info['date']} {time_str}"
-                parsed = await parse_natural_language_message(full_message)
-                
-                encouragements = [
-                    "Parfait! C'est noté! 🚀",
-                    "Super! Ton rappel est prêt! 😊",
-                    "Excellent! Je m'en souviens pour toi! ✨"
-                ]
-                import random
-                
-                return ChatResponse(
-                    response=f"{random.choice(encouragements)}\n\n📝 Rappel: {parsed.title}\n📅 Date: {parsed.date}\n⏰ Heure: {parsed.time}",
-                    type="confirmation",
-                    suggestions=["Créer ce rappel", "Modifier", "Annuler"],
-                    parsed_reminders=[parsed]
-                )
 
+CONFIRMATION_SUGGESTIONS = ["Créer ce rappel", "Modifier", "Annuler"]
+
+
+def _confirmation_response(plan: ChatPlan, parsed: ParsedReminder) -> ChatResponse:
+    if plan.labelled:
+        text = f"{random.choice(plan.encouragements)}\n\n📝 Rappel: {parsed.title}\n📅 Date: {parsed.date}\n⏰ Heure: {parsed.time}"
+    else:
+        text = f"{random.choice(plan.encouragements)}\n\n📝 {parsed.title}\n📅 {parsed.date}\n⏰ {parsed.time}"
+    return ChatResponse(
+        response=text,
+        type="confirmation",
+        suggestions=CONFIRMATION_SUGGESTIONS,
+        parsed_reminders=[parsed]
+    )
+
+
+def _chat_error_response() -> ChatResponse:
+    return ChatResponse(
+        response="Oups! 😅 Peux-tu reformuler?",
+        type="question",
+        suggestions=["Réessayer", "Aide"],
+        parsed_reminders=None
+    )
+
+
+def _read_last_exchange(session: ChatSession, contents: List[str], today: datetime):
+    """Update waiting_for/date from the latest user/assistant exchange"""
+    tomorrow = (today + timedelta(days=1)).strftime("%Y-%m-%d")
+    session.waiting_for = None
+    session.date = None
+    
+    # Check if we asked for date or time
+    for content in reversed(contents[-2:]):
+        past = detect(content)
+        if past.waiting_for:
+            session.waiting_for = past.waiting_for
         
-        # If user is answering with just date (like "demain")
-        if context_info["waiting_for"] == "date" and len(message.split()) <= 2:
-            if any(word in message.lower() for word in ['demain', 'aujourd\'hui', 'lundi', 'mardi']):
-                context_info["date"] = message
-                
-                # Now ask for time
-                return ChatResponse(
-                    response=f"Cool! {message.capitalize()}. Et à quelle heure? ⏰",
-                    type="question",
-                    suggestions=["9h00", "14h00", "18h00"],
-                    parsed_reminders=None
-                )
-        
-        # Detect multiple tasks first
-        task_indicators = ['et', ',', 'puis', 'après', 'ensuite', 'aussi']
-        has_multiple_tasks = any(indicator in message.lower() for indicator in task_indicators)
-        
-        if has_multiple_tasks and len(message.split()) > 5:
-            tasks = re.split(r',|\set\s|\spuis\s|\saprès\s|\sensuite\s|\saussi\s', message)
-            tasks = [t.strip() for t in tasks if len(t.strip()) > 3]
-            
-            if len(tasks) > 1:
-                task_list = "\n".join([f"• {task}" for task in tasks])
-                return ChatResponse(
-                    response=f"🎯 J'ai repéré {len(tasks)} tâches! Parfait:\n\n{task_list}\n\nJe crée un rappel pour chacune? (Ton futur toi va adorer! 😊)",
-                    type="multiple_tasks",
-                    suggestions=["Oui!", "Non, juste la 1ère", "Combine-les"],
-                    parsed_reminders=None
-                )
-        
-        # Check what's missing in current message
-        has_date = any(word in message.lower() for word in ['demain', 'aujourd\'hui', 'lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi', 'samedi', 'dimanche']) or re.search(r'\d{1,2}[/-]\d{1,2}', message.lower())
-        has_time = re.search(r'\d{1,2}h\d{0,2}|\d{1,2}:\d{2}', message)
+        # Extract date if present
+        if 'demain' in past.date_words:
+            session.date = tomorrow
+        elif past.iso_date:
+            session.date = past.iso_date
+
+
+def _session_from_history(history: List[dict], today: datetime) -> ChatSession:
+    """Rebuild the slots from a full transcript (clients without a session_id)"""
+    session = chat_sessions.create()
+    
+    # The task is the latest user message that is not just a date/time answer
+    for h in reversed(history):
+        if h.get('role') == 'user' and _starts_new_task(h.get('content', ''), today):
+            session.task = h.get('content', '')
+            break
+    
+    _read_last_exchange(session, [h.get('content', '') for h in history[-2:]], today)
+    return session
+
+
+def _starts_new_task(message: str, today: datetime, signals: Optional[MessageSignals] = None) -> bool:
+    """True if the message brings a task of its own, rather than only a date/time for the current one"""
+    signals = signals or detect(message)
+    return signals.has_task_keyword or any(ch.isalpha() for ch in task_title(message, today))
+
+
+def _record_exchange(session: ChatSession, message: str, response: ChatResponse, today: datetime):
+    """Fold one turn into the session slots, in O(1) regardless of conversation length"""
+    if response.type == "confirmation":
+        # The reminder is complete: the next date/time answer must not reuse its task
+        session.task = None
+        session.partial = None
+    elif _starts_new_task(message, today):
+        session.task = message
+        session.partial = None
+    _read_last_exchange(session, [message, response.response], today)
+    session.turns += 1
+    response.session_id = session.id
+
+
+async def _load_chat_session(request: ChatRequest) -> ChatSession:
+    if request.session_id:
+        session = await chat_sessions.get(request.session_id)
+        if session is not None:
+            return session
+    return _session_from_history(request.conversation_history or [], datetime.now(PARIS_TZ))
+
+
+SLOT_FILLED_ENCOURAGEMENTS = [
+    "Parfait! C'est noté! 🚀",
+    "Super! Ton rappel est prêt! 😊",
+    "Excellent! Je m'en souviens pour toi! ✨"
+]
+
+
+def _session_partial(session: ChatSession, today: datetime) -> Optional[dict]:
+    """Known title/description of the session task; derived locally the first time, None if unusable"""
+    if session.partial and session.partial.get("task") == session.task:
+        return session.partial
+    title = task_title(session.task, today)
+    if not title or any(ch.isdigit() for ch in title):
+        return None
+    task_date = parse_slot_date(session.task, today)
+    session.partial = {
+        "task": session.task,
+        "title": title,
+        "description": None,
+        "date": task_date.isoformat() if task_date is not None else None
+    }
+    return session.partial
+
+
+def _fill_slots(session: ChatSession, answer: str, today: datetime) -> Optional[ParsedReminder]:
+    """Complete the session reminder from a short date/time answer, without any LLM call"""
+    partial = _session_partial(session, today)
+    if partial is None:
+        return None
+    answer_date = parse_slot_date(answer, today)
+    if answer_date is not None:
+        # Kept for the next turn, which will bring the time
+        partial["date"] = answer_date.isoformat()
+    answer_time = parse_slot_time(answer, today)
+    date_text = partial.get("date") or session.date
+    if answer_time is None or not date_text:
+        return None
+    reminder_date = datetime.strptime(date_text, "%Y-%m-%d").date()
+    moment = PARIS_TZ.localize(datetime.combine(reminder_date, answer_time))
+    return ParsedReminder(
+        title=partial["title"],
+        description=partial.get("description"),
+        date=reminder_date.isoformat(),
+        time=answer_time.strftime("%H:%M"),
+        datetime_iso=moment.isoformat(),
+        timezone="Europe/Paris"
+    )
+
+
+def _plan_chat_turn(message: str, session: ChatSession) -> ChatPlan:
+    """Run the conversation heuristics; no LLM call happens here"""
+    logger.info(f"📨 Message reçu: '{message}'")
+    logger.info(f"📚 Session {session.id} (tour {session.turns}, attend: {session.waiting_for})")
+    llm_key = os.environ.get('EMERGENT_LLM_KEY')
+    if not llm_key:
+        raise ValueError("EMERGENT_LLM_KEY not found in environment")
+    
+    today = datetime.now(PARIS_TZ)
+    
+    signals = detect(message)
+    
+    # Short answer to our date/time question: fill the missing slots locally, unless it brings a new task
+    if (session.waiting_for in ("date", "time") and session.task and signals.word_count <= 4
+            and not _starts_new_task(message, today, signals)):
+        parsed = _fill_slots(session, message, today)
+        if parsed is not None:
+            return ChatPlan(parsed=parsed, encouragements=SLOT_FILLED_ENCOURAGEMENTS, labelled=True)
+    
+    # If user is answering with just time (like "14h")
+    if session.waiting_for == "time" and signals.is_bare_time:
+        # User is giving just the time
+        time_str = message.strip()
+        if not 'h' in time_str and not ':' in time_str:
+            time_str = time_str + "h00"
+        elif 'h' in time_str and len(time_str.split('h')[1]) == 0:
+            time_str = time_str + "00"
         
-        if not has_date:
-            tomorrow_str = (today + timedelta(days=1)).strftime("%A %d %B")
-            return ChatResponse(
-                response=f"Ok! Pour '{message}', c'est pour quand? 📅",
-                type="question",
-                suggestions=[f"Demain ({tomorrow_str})", "Aujourd'hui", "Dans 2 jours"],
-                parsed_reminders=None
+        # Reconstruct full message with task, date AND time
+        if session.task and session.date:
+            # We have all info: task + date + time
+            return ChatPlan(
+                parse_message=f"{session.task} {session.date} {time_str}",
+                encouragements=SLOT_FILLED_ENCOURAGEMENTS,
+                labelled=True
             )
-        
-        if not has_time:
-            return ChatResponse(
-                response="Et à quelle heure? ⏰",
+
+    
+    # If user is answering with just date (like "demain")
+    if session.waiting_for == "date" and signals.word_count <= 2:
+        if DATE_ANSWER_WORDS.intersection(signals.date_words):
+            # Now ask for time
+            return ChatPlan(response=ChatResponse(
+                response=f"Cool! {message.capitalize()}. Et à quelle heure? ⏰",
                 type="question",
                 suggestions=["9h00", "14h00", "18h00"],
                 parsed_reminders=None
-            )
-        
-        # If we have all info, parse and confirm
-        parsed = await parse_natural_language_message(message)
-        
-        encouragements = [
+            ))
+    
+    # Detect multiple tasks first
+    if signals.word_count > 5 and len(signals.tasks) > 1:
+        task_list = "\n".join([f"• {task}" for task in signals.tasks])
+        return ChatPlan(response=ChatResponse(
+            response=f"🎯 J'ai repéré {len(signals.tasks)} tâches! Parfait:\n\n{task_list}\n\nJe crée un rappel pour chacune? (Ton futur toi va adorer! 😊)",
+            type="multiple_tasks",
+            suggestions=["Oui!", "Non, juste la 1ère", "Combine-les"],
+            parsed_reminders=None
+        ))
+    
+    # Check what's missing in current message
+    if not signals.has_date:
+        tomorrow_date = today + timedelta(days=1)
+        tomorrow_str = f"{DAYS_FR[tomorrow_date.weekday()]} {tomorrow_date.day:02d} {MONTHS_FR[tomorrow_date.month]}"
+        return ChatPlan(response=ChatResponse(
+            response=f"Ok! Pour '{message}', c'est pour quand? 📅",
+            type="question",
+            suggestions=[f"Demain ({tomorrow_str})", "Aujourd'hui", "Dans 2 jours"],
+            parsed_reminders=None
+        ))
+    
+    if not signals.has_time:
+        return ChatPlan(response=ChatResponse(
+            response="Et à quelle heure? ⏰",
+            type="question",
+            suggestions=["9h00", "14h00", "18h00"],
+            parsed_reminders=None
+        ))
+    
+    # If we have all info, parse and confirm
+    return ChatPlan(
+        parse_message=message,
+        encouragements=[
             "Parfait! C'est dans la boîte! 🚀",
             "Top! Je garde ça en tête! 😊",
             "Excellent! Une chose de moins à oublier! ✨"
         ]
-        import random
-        
-        return ChatResponse(
-            response=f"{random.choice(encouragements)}\n\n📝 {parsed.title}\n📅 {parsed.date}\n⏰ {parsed.time}",
-            type="confirmation",
-            suggestions=["Créer ce rappel", "Modifier", "Annuler"],
-            parsed_reminders=[parsed]
-        )
+    )
+
+
+async def intelligent_chat_assistant(message: str, session: ChatSession) -> ChatResponse:
+    """Assistant IA conversationnel pour aider les utilisateurs TDAH"""
+    try:
+        plan = _plan_chat_turn(message, session)
+        if plan.response is not None:
+            response = plan.response
+        else:
+            parsed = plan.parsed or await parse_natural_language_message(plan.parse_message)
+            response = _confirmation_response(plan, parsed)
         
+    except (AdmissionRejected, RateLimited):
+        # Shed before anything is recorded: the client retries the same turn after Retry-After
+        raise
     except Exception as e:
         logger.error(f"Chat assistant error: {str(e)}")
-        return ChatResponse(
-            response="Oups! 😅 Peux-tu reformuler?",
-            type="question",
-            suggestions=["Réessayer", "Aide"],
-            parsed_reminders=None
-        )
+        response = _chat_error_response()
+    
+    _record_exchange(session, message, response, datetime.now(PARIS_TZ))
+    await chat_sessions.save(session)
+    return response
+
+
+async def stream_chat_assistant(message: str, session: ChatSession) -> AsyncIterator[str]:
+    """Same conversation as intelligent_chat_assistant, emitted as Server-Sent Events.
+
+    The response type and suggestions go out as soon as the heuristics decide them;
+    reminder fields follow one by one as the streamed OpenAI completion produces them.
+    """
+    try:
+        plan = _plan_chat_turn(message, session)
+        if plan.response is not None:
+            response = plan.response
+            yield sse_event("meta", {"type": response.type, "suggestions": response.suggestions, "session_id": session.id})
+        else:
+            yield sse_event("meta", {"type": "confirmation", "suggestions": CONFIRMATION_SUGGESTIONS, "session_id": session.id})
+            
+            today = datetime.now(PARIS_TZ)
+            if plan.parsed is not None:
+                parsed, cache_key = plan.parsed, None
+            else:
+                parsed, cache_key = await _parse_without_llm(plan.parse_message, today)
+            streamed = False
+            if parsed is None:
+                # The 200 response has already started: a shed or unavailable upstream degrades to the local parse
+                try:
+                    # Explicit deadline: a context variable would not survive the generator's yields
+                    deadline = time.monotonic() + LLM_TOTAL_BUDGET_SECONDS
+                    await _charge_llm_call()
+                    async with llm_admission.slot(current_client.get(), max_wait=remaining_budget(deadline)):
+                        started = time.monotonic()
+                        try:
+                            # Fields are shown as they stream and cannot be taken back: use the strongest tier directly.
+                            # Only the stream opening is guarded, without hedging (a duplicate stream would be wasted)
+                            stream = await openai_resilience.call(lambda: openai_client.chat.completions.create(
+                                model=parse_router.strongest,
+                                messages=_parse_prompt_messages(plan.parse_message, today),
+                                temperature=0.1,
+                                response_format={"type": "json_object"},
+                                stream=True
+                            ), hedge=False, deadline=deadline)
+                        except UpstreamUnavailableError as e:
+                            logger.warning(f"OpenAI unavailable, degraded local parse: {str(e)}")
+                            stream = None
+                        
+                        if stream is not None:
+                            fields = JSONFieldStream()
+                            async for chunk in stream:
+                                if not chunk.choices or not chunk.choices[0].delta.content:
+                                    continue
+                                for name, value in fields.feed(chunk.choices[0].delta.content):
+                                    if name == "datetime_iso" and value:
+                                        value = _llm_datetime_iso(value, "Europe/Paris")
+                                    yield sse_event("field", {"name": name, "value": value})
+                            streamed = True
+                            parse_cache.record_llm_call(time.monotonic() - started)
+                            parse_router.record_latency(parse_router.strongest, time.monotonic() - started)
+                            
+                            parsed_data = json.loads(fields.text)
+                            if parsed_data.get("datetime_iso"):
+                                parsed_data["datetime_iso"] = _llm_datetime_iso(parsed_data["datetime_iso"], parsed_data.get("timezone"))
+                            parsed = ParsedReminder(**parsed_data)
+                            if cache_key:
+                                await parse_cache.set(cache_key, parsed.dict())
+                except AdmissionRejected as e:
+                    logger.warning(f"OpenAI call shed, degraded local parse: {e.reason}")
+                except RateLimited:
+                    logger.warning("OpenAI call rate limited, degraded local parse")
+            
+            if parsed is None:
+                parsed = _degraded_parse(plan.parse_message, today)
+            if not streamed:
+                for name, value in parsed.dict().items():
+                    yield sse_event("field", {"name": name, "value": value})
+            
+            response = _confirmation_response(plan, parsed)
+        
+    except Exception as e:
+        logger.error(f"Chat stream error: {str(e)}")
+        response = _chat_error_response()
+    
+    _record_exchange(session, message, response, datetime.now(PARIS_TZ))
+    await chat_sessions.save(session)
+    yield sse_event("done", response.dict())
 
 
 # API Routes
@@ -398,80 +1074,407 @@ async def root():
     return {"message": "API de rappels par message IA"}
 
 
+@api_router.get("/metrics")
+async def get_metrics():
+    """Compteurs de performance (cache de parsing, ...)"""
+    return {
+        "parse_cache": parse_cache.stats(),
+        "reminders_version": reminders_version.stats(),
+        "parse_routing": parse_router.stats(),
+        "openai": openai_resilience.stats(),
+        "llm_admission": llm_admission.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "llm_single_flight": llm_flights.stats(),
+        "chat_sessions": chat_sessions.stats(),
+        "reminder_events": reminder_events.stats(),
+        "scheduler": reminder_scheduler.stats(),
+        "agenda_cache": agenda_cache.stats(),
+        "upcoming_cache": upcoming_cache.stats(),
+        "archiver": reminder_archiver.stats(),
+    }
+
+
 @api_router.post("/parse-message", response_model=ParsedReminder)
 async def parse_message(request: ParseMessageRequest):
     """Parse un message en langage naturel pour extraire les informations du rappel"""
     return await parse_natural_language_message(request.message)
 
 
+@api_router.post("/parse-messages", response_model=BatchParseResponse)
+async def parse_messages(request: BatchParseRequest):
+    """Parse plusieurs messages en un seul appel (résultats dans l'ordre d'entrée)"""
+    today = datetime.now(PARIS_TZ)
+    results = [BatchParseItem(index=i, message=m) for i, m in enumerate(request.messages)]
+    
+    # Local parser and cache first; only the misses go to OpenAI
+    misses = []
+    for item in results:
+        try:
+            parsed, cache_key = await _parse_without_llm(item.message, today)
+        except Exception as e:
+            item.error = f"Erreur parsing: {str(e)}"
+            continue
+        if parsed is not None:
+            item.parsed = parsed
+        else:
+            misses.append((item, cache_key))
+    
+    concurrency = min(request.max_concurrency or PARSE_BATCH_CONCURRENCY, PARSE_BATCH_CONCURRENCY)
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def resolve(item: BatchParseItem, cache_key: Optional[str]):
+        async with semaphore:
+            try:
+                item.parsed = await _parse_with_llm(item.message, today, cache_key)
+            except AdmissionRejected as e:
+                item.error = f"Service saturé, réessaie dans {e.retry_after} s"
+            except RateLimited as e:
+                item.error = f"Trop de requêtes, réessaie dans {e.retry_after} s"
+            except json.JSONDecodeError as e:
+                item.error = f"Erreur JSON: {str(e)}"
+            except Exception as e:
+                logger.error(f"Error parsing batch item {item.index}: {str(e)}")
+                item.error = f"Erreur parsing: {str(e)}"
+    
+    # The whole batch shares one LLM budget, inherited by each resolve task
+    with deadline_budget(LLM_TOTAL_BUDGET_SECONDS):
+        await asyncio.gather(*(resolve(item, cache_key) for item, cache_key in misses))
+    return BatchParseResponse(results=results)
+
+
 @api_router.post("/chat", response_model=ChatResponse)
 async def chat_assistant(request: ChatRequest):
     """Assistant IA conversationnel intelligent pour les utilisateurs TDAH"""
-    return await intelligent_chat_assistant(request.message, request.conversation_history)
+    session = await _load_chat_session(request)
+    return await intelligent_chat_assistant(request.message, session)
+
+
+@api_router.post("/chat/stream")
+async def chat_assistant_stream(request: ChatRequest):
+    """Variante de /chat en Server-Sent Events (meta, field..., done)"""
+    session = await _load_chat_session(request)
+    return StreamingResponse(
+        stream_chat_assistant(request.message, session),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _build_reminder_doc(reminder: ReminderCreate) -> dict:
+    """Document for a new reminder; ValueError if datetime_iso cannot be read"""
+    now = datetime.utcnow().isoformat()
+    return {
+        "id": str(uuid.uuid4()),
+        "title": reminder.title,
+        "description": reminder.description,
+        "datetime_iso": reminder.datetime_iso,
+        "due_at": to_due_at(reminder.datetime_iso, reminder.timezone),
+        "timezone": reminder.timezone,
+        "status": "scheduled",
+        "recurrence": reminder.recurrence,
+        "created_at": now,
+        "updated_at": now,
+        "version": 1
+    }
 
 
 @api_router.post("/reminders", response_model=Reminder)
 async def create_reminder(reminder: ReminderCreate):
     """Créer un nouveau rappel"""
     try:
-        reminder_id = str(uuid.uuid4())
-        now = datetime.utcnow().isoformat()
+        reminder_doc = _build_reminder_doc(reminder)
+        async with reminders_version.reserve() as seq:
+            reminder_doc["seq"] = seq
+            await db.reminders.insert_one(reminder_doc)
+        notify_reminder_change(_reminder_event("created", reminder_doc["seq"], reminder_doc))
         
-        reminder_doc = {
-            "id": reminder_id,
-            "title": reminder.title,
-            "description": reminder.description,
-            "datetime_iso": reminder.datetime_iso,
-            "timezone": reminder.timezone,
-            "status": "scheduled",
-            "recurrence": reminder.recurrence,
-            "created_at": now,
-            "updated_at": now
-        }
-        
-        await db.reminders.insert_one(reminder_doc)
-        
-        # Remove MongoDB _id before returning
-        reminder_doc.pop('_id', None)
-        return Reminder(**reminder_doc)
+        return FastJSONResponse({name: reminder_doc[name] for name in Reminder.model_fields})
         
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Date invalide: datetime_iso doit être au format ISO 8601")
     except Exception as e:
         logger.error(f"Error creating reminder: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erreur lors de la création: {str(e)}")
 
 
+@api_router.post("/reminders/bulk", response_model=BulkCreateResponse)
+async def create_reminders_bulk(reminders: List[Dict[str, Any]] = Body(..., max_length=REMINDERS_BULK_MAX)):
+    """Créer plusieurs rappels en un seul aller-retour (résultat par élément)"""
+    results = [{"index": i, "reminder": None, "error": None} for i in range(len(reminders))]
+    
+    # Validate each item on its own so one bad entry does not reject the batch
+    docs, doc_indexes = [], []
+    for i, item in enumerate(reminders):
+        try:
+            docs.append(_build_reminder_doc(ReminderCreate(**item)))
+            doc_indexes.append(i)
+        except ValidationError as e:
+            results[i]["error"] = f"Rappel invalide: {e.errors()[0]['loc'][0]} {e.errors()[0]['msg']}"
+        except ValueError:
+            results[i]["error"] = "Date invalide: datetime_iso doit être au format ISO 8601"
+    
+    failed = {}
+    if docs:
+        try:
+            async with reminders_version.reserve(len(docs)) as last_seq:
+                for position, doc in enumerate(docs):
+                    doc["seq"] = last_seq - len(docs) + 1 + position
+                # Unordered: one failing document does not stop the others
+                await db.reminders.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                failed[write_error["index"]] = write_error.get("errmsg", "Erreur d'écriture")
+        except Exception as e:
+            logger.error(f"Error creating reminders in bulk: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Erreur lors de la création: {str(e)}")
+    
+    for position, (i, doc) in enumerate(zip(doc_indexes, docs)):
+        if position in failed:
+            results[i]["error"] = f"Erreur lors de la création: {failed[position]}"
+        else:
+            results[i]["reminder"] = {name: doc[name] for name in Reminder.model_fields}
+            notify_reminder_change(_reminder_event("created", doc["seq"], doc))
+    
+    return FastJSONResponse({"results": results})
+
+
+def _encode_cursor(due_at: Optional[datetime], reminder_id: str) -> str:
+    raw = json.dumps([due_at.isoformat() if due_at else None, reminder_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[Optional[datetime], str]:
+    try:
+        due_at, reminder_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if not isinstance(reminder_id, str):
+            raise ValueError("cursor id must be a string")
+        return (datetime.fromisoformat(due_at) if due_at is not None else None), reminder_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+
+def _parse_range_bound(value: Optional[str], name: str) -> Optional[datetime]:
+    if value is None:
+        return None
+    try:
+        # Offset-less bounds are Paris local times, like the reminders themselves
+        return to_due_at(value, "Europe/Paris")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Paramètre `{name}` invalide (format ISO attendu)")
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison: W/"x" and "x" designate the same representation
+    return "*" in candidates or etag.removeprefix("W/") in [tag.removeprefix("W/") for tag in candidates]
+
+
 @api_router.get("/reminders", response_model=List[Reminder])
-async def get_reminders(status: Optional[str] = None):
-    """Récupérer la liste des rappels"""
+async def get_reminders(
+    status: Optional[str] = None,
+    limit: int = Query(REMINDERS_PAGE_MAX, ge=1, le=REMINDERS_PAGE_MAX),
+    cursor: Optional[str] = None,
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None,
+    archived: bool = False,
+    if_none_match: Optional[str] = Header(None)
+):
+    """Récupérer la liste des rappels, entre `from` (inclus) et `to` (exclu) si précisés
+    (page suivante via l'en-tête X-Next-Cursor) ; `archived=true` lit les rappels archivés"""
     try:
+        # The ETag comes from the collection change version: an unchanged
+        # collection is answered with 304 without querying the reminders
+        version = await get_reminders_version()
+        variant = hashlib.sha1(f"{status}|{limit}|{cursor}|{from_}|{to}|{archived}".encode("utf-8")).hexdigest()[:12]
+        etag = f'W/"{version}-{variant}"'
+        cache_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=cache_headers)
+        
         query = {}
         if status:
             query["status"] = status
         
-        reminders = await db.reminders.find(query).sort("datetime_iso", 1).to_list(1000)
+        # "Today" / "this week" views are range scans on the (status, due_at, id) index
+        due_range = {}
+        range_start = _parse_range_bound(from_, "from")
+        range_end = _parse_range_bound(to, "to")
+        if range_start is not None:
+            due_range["$gte"] = range_start
+        if range_end is not None:
+            due_range["$lt"] = range_end
+        if due_range:
+            query["due_at"] = due_range
+        
+        after = _decode_cursor(cursor) if cursor else None
         
-        # Remove MongoDB _id from all reminders
-        for reminder in reminders:
-            reminder.pop('_id', None)
+        # Scheduled reminders of the upcoming window come from memory while the cache is current
+        rows = None
+        if status == "scheduled" and not archived and (after is None or after[0] is not None):
+            rows = upcoming_cache.query(version, range_start, range_end, after, limit + 1)
+        
+        if rows is None:
+            # Keyset pagination on (due_at, id), served by the matching compound index
+            if after is not None:
+                after_due_at, after_id = after
+                if after_due_at is None:
+                    # Reminders without due_at (unreadable date) sort first
+                    query["$or"] = [{"due_at": None, "id": {"$gt": after_id}}, {"due_at": {"$ne": None}}]
+                else:
+                    query["$or"] = [
+                        {"due_at": {"$gt": after_due_at}},
+                        {"due_at": after_due_at, "id": {"$gt": after_id}}
+                    ]
+            
+            # The projection drops _id at the source; documents are serialized as-is
+            # The archive is only read when explicitly asked for
+            collection = db.reminders_archive if archived else db.reminders
+            docs = await collection.find(query, {**REMINDER_PROJECTION, "due_at": 1}).sort(
+                [("due_at", 1), ("id", 1)]
+            ).limit(limit + 1).to_list(limit + 1)
+            rows = [(doc.pop("due_at", None), doc) for doc in docs]
         
-        return [Reminder(**reminder) for reminder in reminders]
+        headers = dict(cache_headers)
+        if len(rows) > limit:
+            rows = rows[:limit]
+            headers["X-Next-Cursor"] = _encode_cursor(rows[-1][0], rows[-1][1]["id"])
+        reminders = [doc for _, doc in rows]
         
+        return FastJSONResponse(reminders, headers=headers)
+        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching reminders: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
 
 
+@api_router.get("/reminders/changes", response_model=ReminderChanges)
+async def get_reminder_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(REMINDERS_PAGE_MAX, ge=1, le=REMINDERS_PAGE_MAX)
+):
+    """Rappels créés ou modifiés et suppressions depuis la version `since`"""
+    try:
+        # Read first: every seq up to the committed version is already written and visible.
+        # Later seqs (writes in flight, or finished out of order) wait for the next call.
+        committed = await get_reminders_version()
+        seq_range = {"$gt": since, "$lte": committed}
+        changed = await db.reminders.find(
+            {"seq": seq_range}, {**REMINDER_PROJECTION, "seq": 1}
+        ).sort("seq", 1).limit(limit + 1).to_list(limit + 1)
+        deleted = await db.reminder_tombstones.find(
+            {"seq": seq_range}, {"_id": 0, "id": 1, "seq": 1}
+        ).sort("seq", 1).limit(limit + 1).to_list(limit + 1)
+        
+        # Merge both streams in seq order and cut the page at `limit` entries
+        entries = sorted(
+            [(doc["seq"], "changed", doc) for doc in changed] + [(doc["seq"], "deleted", doc) for doc in deleted],
+            key=lambda entry: entry[0]
+        )
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        
+        # The next `since` is the last seq actually returned, so nothing is skipped
+        # when the caller comes back for the following page
+        version = entries[-1][0] if entries else since
+        if not has_more:
+            version = max(version, committed)
+        
+        result = {"version": version, "changed": [], "deleted": [], "has_more": has_more}
+        for _, kind, doc in entries:
+            if kind == "changed":
+                doc.pop("seq")
+                result["changed"].append(doc)
+            else:
+                result["deleted"].append(doc["id"])
+        return FastJSONResponse(result)
+        
+    except Exception as e:
+        logger.error(f"Error fetching reminder changes: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la synchronisation: {str(e)}")
+
+
+def _agenda_pipeline(query: dict, per_day: Optional[int]) -> List[dict]:
+    reminder_fields = {name: f"${name}" for name in Reminder.model_fields}
+    counts = {
+        status: {"$sum": {"$cond": [{"$eq": ["$status", status]}, 1, 0]}}
+        for status in REMINDER_STATUSES
+    }
+    return [
+        {"$match": query},
+        {"$sort": {"due_at": 1, "id": 1}},
+        {"$group": {
+            # Local day in the reminder's own timezone, computed by the server
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$due_at", "timezone": "$timezone"}},
+            "total": {"$sum": 1},
+            **counts,
+            "reminders": {"$push": reminder_fields}
+        }},
+        {"$sort": {"_id": 1}},
+        {"$project": {
+            "_id": 0,
+            "date": "$_id",
+            "total": 1,
+            "counts": {status: f"${status}" for status in REMINDER_STATUSES},
+            "reminders": {"$slice": ["$reminders", per_day]} if per_day else 1
+        }}
+    ]
+
+
+@api_router.get("/reminders/agenda", response_model=Agenda)
+async def get_reminders_agenda(
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None,
+    status: Optional[str] = None,
+    per_day: Optional[int] = Query(None, ge=1)
+):
+    """Rappels regroupés par jour avec les compteurs par statut (défaut : aujourd'hui + 7 jours)"""
+    range_start = _parse_range_bound(from_, "from")
+    if range_start is None:
+        midnight = PARIS_TZ.localize(datetime.combine(datetime.now(PARIS_TZ).date(), datetime.min.time()))
+        range_start = midnight.astimezone(pytz.utc).replace(tzinfo=None)
+    range_end = _parse_range_bound(to, "to") or range_start + timedelta(days=AGENDA_DEFAULT_DAYS)
+    if range_end <= range_start:
+        raise HTTPException(status_code=400, detail="`to` doit être postérieur à `from`")
+    if range_end - range_start > timedelta(days=AGENDA_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"Plage limitée à {AGENDA_MAX_DAYS} jours")
+    
+    try:
+        version = await get_reminders_version()
+        cache_key = (range_start, range_end, status, per_day)
+        agenda = agenda_cache.get(cache_key, version)
+        if agenda is None:
+            query = {"due_at": {"$gte": range_start, "$lt": range_end}}
+            if status:
+                query["status"] = status
+            days = await db.reminders.aggregate(_agenda_pipeline(query, per_day)).to_list(None)
+            agenda = {
+                "start": range_start.isoformat() + "Z",
+                "end": range_end.isoformat() + "Z",
+                "days": days,
+                "counts": {s: sum(day["counts"][s] for day in days) for s in REMINDER_STATUSES}
+            }
+            agenda_cache.set(cache_key, version, agenda)
+        return FastJSONResponse(agenda)
+        
+    except Exception as e:
+        logger.error(f"Error building agenda: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erreur lors du calcul de l'agenda: {str(e)}")
+
+
 @api_router.get("/reminders/{reminder_id}", response_model=Reminder)
 async def get_reminder(reminder_id: str):
     """Récupérer un rappel spécifique"""
     try:
-        reminder = await db.reminders.find_one({"id": reminder_id})
+        reminder = await db.reminders.find_one({"id": reminder_id}, REMINDER_PROJECTION)
         
         if not reminder:
             raise HTTPException(status_code=404, detail="Rappel non trouvé")
         
-        reminder.pop('_id', None)
-        return Reminder(**reminder)
+        return FastJSONResponse(reminder)
         
     except HTTPException:
         raise
@@ -480,30 +1483,107 @@ async def get_reminder(reminder_id: str):
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération: {str(e)}")
 
 
+@api_router.get("/reminders/{reminder_id}/occurrences", response_model=ReminderOccurrences)
+async def get_reminder_occurrences(
+    reminder_id: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=REMINDERS_PAGE_MAX)
+):
+    """Occurrences d'un rappel entre `start` (défaut : maintenant) et `end` (défaut : +31 jours)"""
+    reminder = await db.reminders.find_one(
+        {"id": reminder_id},
+        {"_id": 0, "id": 1, "datetime_iso": 1, "timezone": 1, "recurrence": 1, "series_start": 1}
+    )
+    if not reminder:
+        raise HTTPException(status_code=404, detail="Rappel non trouvé")
+    
+    timezone = reminder.get("timezone") or "Europe/Paris"
+    try:
+        window_start = parse_datetime(start, timezone) if start else datetime.now(pytz.utc)
+        window_end = parse_datetime(end, timezone) if end else window_start + timedelta(days=31)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Paramètre de date invalide (format ISO attendu)")
+    if window_end <= window_start:
+        raise HTTPException(status_code=400, detail="`end` doit être postérieur à `start`")
+    
+    try:
+        rule = parse_rule(reminder.get("recurrence"))
+        first = parse_datetime(reminder.get("series_start") or reminder["datetime_iso"], timezone)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Impossible de calculer les occurrences: {str(e)}")
+    
+    if rule is None:
+        series = iter([first] if first >= window_start else [])
+    else:
+        series = occurrences(rule, first, timezone, since=window_start)
+    
+    # Lazy: stop at the window end or one past the limit, whichever comes first
+    found = []
+    try:
+        for occurrence in series:
+            if occurrence > window_end or len(found) > limit:
+                break
+            found.append(occurrence.isoformat())
+    except (ValueError, pytz.UnknownTimeZoneError) as e:
+        # Reminders stored before the timezone was validated
+        raise HTTPException(status_code=400, detail=f"Impossible de calculer les occurrences: {str(e)}")
+    
+    return FastJSONResponse({
+        "id": reminder_id,
+        "recurrence": reminder.get("recurrence"),
+        "occurrences": found[:limit],
+        "has_more": len(found) > limit
+    })
+
+
 @api_router.patch("/reminders/{reminder_id}", response_model=Reminder)
 async def update_reminder(reminder_id: str, update: ReminderUpdate):
     """Mettre à jour un rappel"""
     try:
-        reminder = await db.reminders.find_one({"id": reminder_id})
-        
-        if not reminder:
-            raise HTTPException(status_code=404, detail="Rappel non trouvé")
-        
         # Prepare update data
         update_data = update.dict(exclude_unset=True)
+        expected_version = update_data.pop("expected_version", None)
+        if update_data.get("datetime_iso") is not None:
+            try:
+                parsed_due = datetime.fromisoformat(update_data["datetime_iso"])
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Date invalide: datetime_iso doit être au format ISO 8601")
+            timezone = None
+            if parsed_due.tzinfo is None:
+                # Offset-less times are read in the reminder's own timezone
+                current = await db.reminders.find_one({"id": reminder_id}, {"_id": 0, "timezone": 1})
+                timezone = current.get("timezone") if current else None
+            update_data["due_at"] = to_due_at(update_data["datetime_iso"], timezone)
         update_data["updated_at"] = datetime.utcnow().isoformat()
         
-        # Update in database
-        await db.reminders.update_one(
-            {"id": reminder_id},
-            {"$set": update_data}
-        )
+        query = {"id": reminder_id}
+        if expected_version is not None:
+            # Reminders created before versioning have no version field
+            query["version"] = {"$in": [0, None]} if expected_version == 0 else expected_version
+        
+        changes = {"$set": update_data, "$inc": {"version": 1}}
+        if "datetime_iso" in update_data or "recurrence" in update_data:
+            # A rescheduled series restarts from the new date
+            changes["$unset"] = {"series_start": ""}
+        
+        # Single atomic round trip returning the post-update document
+        async with reminders_version.reserve() as seq:
+            update_data["seq"] = seq
+            updated_reminder = await db.reminders.find_one_and_update(
+                query,
+                changes,
+                projection=REMINDER_PROJECTION,
+                return_document=ReturnDocument.AFTER
+            )
         
-        # Fetch updated reminder
-        updated_reminder = await db.reminders.find_one({"id": reminder_id})
-        updated_reminder.pop('_id', None)
+        if not updated_reminder:
+            if expected_version is not None and await db.reminders.count_documents({"id": reminder_id}, limit=1):
+                raise HTTPException(status_code=409, detail="Le rappel a été modifié entre-temps")
+            raise HTTPException(status_code=404, detail="Rappel non trouvé")
         
-        return Reminder(**updated_reminder)
+        notify_reminder_change(_reminder_event("updated", update_data["seq"], updated_reminder))
+        return FastJSONResponse(updated_reminder)
         
     except HTTPException:
         raise
@@ -516,11 +1596,19 @@ async def update_reminder(reminder_id: str, update: ReminderUpdate):
 async def delete_reminder(reminder_id: str):
     """Supprimer un rappel"""
     try:
-        result = await db.reminders.delete_one({"id": reminder_id})
-        
-        if result.deleted_count == 0:
-            raise HTTPException(status_code=404, detail="Rappel non trouvé")
-        
+        async with reminders_version.reserve() as seq:
+            result = await db.reminders.delete_one({"id": reminder_id})
+            
+            if result.deleted_count == 0:
+                raise HTTPException(status_code=404, detail="Rappel non trouvé")
+            
+            # Tombstone so delta sync clients learn about the deletion
+            await db.reminder_tombstones.insert_one({
+                "id": reminder_id,
+                "seq": seq,
+                "deleted_at": datetime.utcnow()
+            })
+        notify_reminder_change(_deleted_event(seq, reminder_id))
         return {"message": "Rappel supprimé avec succès", "id": reminder_id}
         
     except HTTPException:
@@ -530,6 +1618,102 @@ async def delete_reminder(reminder_id: str):
         raise HTTPException(status_code=500, detail=f"Erreur lors de la suppression: {str(e)}")
 
 
+async def _wait_for_disconnect(websocket: WebSocket):
+    # Client frames (pings) are ignored; only the disconnect matters
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+@api_router.websocket("/ws")
+async def reminders_websocket(websocket: WebSocket):
+    """Flux temps réel des créations, modifications et suppressions de rappels"""
+    await websocket.accept()
+    subscription = reminder_events.subscribe()
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(websocket))
+    try:
+        # The client catches up from this version with GET /api/reminders/changes
+        await websocket.send_text(dumps({"type": "hello", "version": await get_reminders_version()}).decode("utf-8"))
+        while True:
+            next_event = asyncio.ensure_future(subscription.get())
+            await asyncio.wait({next_event, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if not next_event.done():
+                next_event.cancel()
+                break
+            await websocket.send_text(dumps(next_event.result()).decode("utf-8"))
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.warning(f"Reminder websocket closed: {str(e)}")
+    finally:
+        reminder_events.unsubscribe(subscription)
+        disconnected.cancel()
+
+
+@app.exception_handler(RateLimited)
+async def rate_limited_handler(request: Request, exc: RateLimited):
+    return FastJSONResponse(
+        status_code=429,
+        content={"detail": f"Trop de requêtes, réessaie dans {exc.retry_after} s"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return FastJSONResponse(
+        status_code=503,
+        content={"detail": "Service saturé, réessaie dans quelques secondes"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def client_key(request: Request) -> str:
+    """Client identity for rate limiting and fair queuing.
+
+    Only the X-Forwarded-For hop appended by our own TRUSTED_PROXY_COUNT proxies
+    is used (counted from the right): the hops before it are client-supplied.
+    Without proxies, or with fewer hops than expected, the peer address is used.
+    """
+    if TRUSTED_PROXY_COUNT:
+        hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        if len(hops) >= TRUSTED_PROXY_COUNT:
+            return hops[-TRUSTED_PROXY_COUNT]
+    return request.client.host if request.client else "anonymous"
+
+
+@app.middleware("http")
+async def bind_client_key(request: Request, call_next):
+    token = current_client.set(client_key(request))
+    try:
+        return await call_next(request)
+    finally:
+        current_client.reset(token)
+
+
+def _rate_limit_policy(request: Request) -> Optional[str]:
+    path = request.url.path
+    if request.method == "OPTIONS" or not path.startswith("/api/") or path in ("/api/", "/api/metrics"):
+        return None
+    # LLM tokens are charged where an OpenAI call is admitted (_charge_llm_call)
+    return "crud"
+
+
+@app.middleware("http")
+async def rate_limit(request: Request, call_next):
+    policy = _rate_limit_policy(request) if RATE_LIMIT_ENABLED else None
+    if policy is not None:
+        allowed, retry_after = await rate_limiter.check(policy, client_key(request))
+        if not allowed:
+            return FastJSONResponse(
+                status_code=429,
+                content={"detail": f"Trop de requêtes, réessaie dans {retry_after} s"},
+                headers={"Retry-After": str(retry_after)},
+            )
+    return await call_next(request)
+
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -539,15 +1723,72 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Retry-After"],
 )
 
 
+async def backfill_reminder_seq():
+    """Give a change sequence to reminders written before delta sync existed"""
+    try:
+        missing = await db.reminders.find({"seq": {"$exists": False}}, {"_id": 0, "id": 1}).to_list(None)
+        if not missing:
+            return
+        async with reminders_version.reserve(len(missing)) as last_seq:
+            first_seq = last_seq - len(missing) + 1
+            # The $exists guard lets concurrent workers run this safely
+            await db.reminders.bulk_write([
+                UpdateOne({"id": doc["id"], "seq": {"$exists": False}}, {"$set": {"seq": first_seq + i}})
+                for i, doc in enumerate(missing)
+            ], ordered=False)
+        logger.info(f"✅ Change sequence assigned to {len(missing)} existing reminders")
+    except Exception as e:
+        logger.warning(f"Change sequence backfill failed: {str(e)}")
+
+
+async def backfill_reminder_due_at():
+    """Store the UTC due_at date on reminders that only have the datetime_iso string"""
+    try:
+        missing = await db.reminders.find(
+            {"due_at": {"$exists": False}}, {"_id": 0, "id": 1, "datetime_iso": 1, "timezone": 1}
+        ).to_list(None)
+        updates, unreadable = [], 0
+        for doc in missing:
+            try:
+                due_at = to_due_at(doc.get("datetime_iso"), doc.get("timezone"))
+            except (TypeError, ValueError):
+                unreadable += 1
+                continue
+            updates.append(UpdateOne({"id": doc["id"], "due_at": {"$exists": False}}, {"$set": {"due_at": due_at}}))
+        if updates:
+            await db.reminders.bulk_write(updates, ordered=False)
+            logger.info(f"✅ due_at stored on {len(updates)} existing reminders")
+        if unreadable:
+            logger.warning(f"{unreadable} reminders have an unreadable datetime_iso and no due_at")
+    except Exception as e:
+        logger.warning(f"due_at migration failed: {str(e)}")
+
+
 @app.on_event("startup")
 async def startup_db():
     """Initialize database indexes on startup"""
     await init_db_indexes()
+    await backfill_reminder_seq()
+    await backfill_reminder_due_at()
+    if REMINDER_EVENTS_CHANGE_STREAM:
+        reminder_events.start(_watch_reminder_changes, _event_from_change)
+    if ARCHIVE_ENABLED:
+        reminder_archiver.start()
+    if UPCOMING_CACHE_ENABLED:
+        # Reconciles need the exact version, read before the window is loaded
+        upcoming_cache.start(reminders_version.committed)
+    if SCHEDULER_ENABLED:
+        reminder_scheduler.start(reminder_events.subscribe(queue_size=SCHEDULER_QUEUE_SIZE))
 
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await reminder_scheduler.stop()
+    await upcoming_cache.stop()
+    await reminder_archiver.stop()
+    await reminder_events.stop()
     client.close()
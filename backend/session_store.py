@@ -0,0 +1,86 @@
+"""
+Sessions de conversation côté serveur.
+
+Le client n'envoie plus que son session_id : les créneaux extraits (tâche,
+date, heure, information attendue, rappel partiel) sont conservés ici et mis
+à jour à chaque tour. Stockage en mémoire avec expiration, adossé à MongoDB
+pour que les sessions survivent à un redémarrage et soient partagées entre
+workers (sans collection, les sessions restent en mémoire).
+"""
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChatSession:
+    id: str
+    task: Optional[str] = None
+    date: Optional[str] = None
+    time: Optional[str] = None
+    waiting_for: Optional[str] = None
+    turns: int = 0
+    # Champs déjà connus du rappel en cours ({"task", "title", "description", "date"}), valables tant que la tâche ne change pas
+    partial: Optional[dict] = None
+
+
+class SessionStore:
+    def __init__(self, collection=None, ttl_seconds: int = 3600, max_sessions: int = 10000):
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def ensure_indexes(self):
+        if self.collection is not None:
+            await self.collection.create_index([("updated_at", 1)], expireAfterSeconds=self.ttl_seconds)
+
+    def create(self) -> ChatSession:
+        return ChatSession(id=str(uuid.uuid4()))
+
+    async def get(self, session_id: str) -> Optional[ChatSession]:
+        entry = self._sessions.get(session_id)
+        if entry is not None:
+            expires_at, session = entry
+            if expires_at > time.monotonic():
+                self._sessions.move_to_end(session_id)
+                return session
+            del self._sessions[session_id]
+
+        if self.collection is not None:
+            try:
+                doc = await self.collection.find_one({"_id": session_id}, {"_id": 0, "updated_at": 0})
+            except Exception as e:
+                logger.warning(f"Session lookup failed: {str(e)}")
+                doc = None
+            if doc:
+                session = ChatSession(id=session_id, **doc)
+                self._remember(session)
+                return session
+        return None
+
+    async def save(self, session: ChatSession):
+        self._remember(session)
+        if self.collection is not None:
+            doc = asdict(session)
+            doc.pop("id")
+            doc["updated_at"] = datetime.utcnow()
+            try:
+                await self.collection.update_one({"_id": session.id}, {"$set": doc}, upsert=True)
+            except Exception as e:
+                logger.warning(f"Session save failed: {str(e)}")
+
+    def _remember(self, session: ChatSession):
+        self._sessions[session.id] = (time.monotonic() + self.ttl_seconds, session)
+        self._sessions.move_to_end(session.id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"active_sessions": len(self._sessions), "persistent": self.collection is not None}
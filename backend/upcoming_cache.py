@@ -0,0 +1,213 @@
+"""
+Cache en mémoire des rappels "scheduled" de la fenêtre à venir.
+
+Les lectures par plage de dates à l'intérieur de la fenêtre sont servies
+depuis une liste triée sur (due_at, id), sans aller-retour MongoDB. Les
+écritures de ce worker sont appliquées au fil de l'eau ; le cache suit la
+version de modification de la collection et n'est utilisé que lorsqu'il a vu
+toutes les écritures jusqu'à la version courante. Une écriture venue d'un
+autre worker (trou dans la séquence) le désactive jusqu'à la prochaine
+réconciliation avec la base.
+"""
+import asyncio
+import bisect
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+import pytz
+
+from recurrence import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+
+class UpcomingCache:
+    def __init__(
+        self,
+        collection,
+        fields,
+        lookback_seconds: int = 86400,
+        window_seconds: int = 172800,
+        reconcile_seconds: int = 60,
+        max_entries: int = 50000,
+    ):
+        self.collection = collection
+        self.fields = tuple(fields)
+        self.lookback = timedelta(seconds=lookback_seconds)
+        self.window = timedelta(seconds=window_seconds)
+        self.reconcile_seconds = reconcile_seconds
+        self.max_entries = max_entries
+        # Fenêtre couverte [covered_from, covered_to), en UTC naïf comme due_at
+        self.covered_from: Optional[datetime] = None
+        self.covered_to: Optional[datetime] = None
+        self.version = -1
+        self._order: List[Tuple[datetime, str]] = []
+        self._docs: Dict[str, dict] = {}
+        self._due: Dict[str, datetime] = {}
+        self._seen_seqs: Set[int] = set()
+        # Événements reçus pendant un rechargement, rejoués ensuite
+        self._backlog: Optional[List[dict]] = None
+        self._behind_since: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self.hits = 0
+        self.misses = 0
+        self.reconciles = 0
+
+    # Lecture
+
+    def query(
+        self,
+        version: int,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        after: Optional[Tuple[datetime, str]] = None,
+        limit: int = 1000,
+    ) -> Optional[List[Tuple[datetime, dict]]]:
+        """Rappels de [start, end) triés par (due_at, id), ou None si le cache ne peut pas répondre"""
+        if (version != self.version or start is None or end is None
+                or start < self.covered_from or end > self.covered_to):
+            self.misses += 1
+            if version > self.version:
+                # Une écriture locale en cours rattrape la version en quelques ms ;
+                # seul un retard qui dure signale une écriture d'un autre worker
+                if self._behind_since is None:
+                    self._behind_since = time.monotonic()
+                elif time.monotonic() - self._behind_since > 1.0:
+                    self._request_reconcile()
+            return None
+        low = bisect.bisect_left(self._order, (start, ""))
+        if after is not None:
+            low = max(low, bisect.bisect_right(self._order, after))
+        high = bisect.bisect_left(self._order, (end, ""))
+        self.hits += 1
+        return [(due_at, dict(self._docs[reminder_id])) for due_at, reminder_id in self._order[low:min(high, low + limit)]]
+
+    # Écriture (write-through)
+
+    def apply(self, event: dict):
+        """Applique un événement created / updated / deleted / due émis après une écriture"""
+        if self._backlog is not None:
+            self._backlog.append(event)
+        if self.version < 0:
+            return
+        kind = event.get("type")
+        if kind == "deleted":
+            self._remove(event["id"])
+        elif kind in ("created", "updated", "due"):
+            self._upsert(event["reminder"])
+        self._observe(event.get("seq"))
+
+    def _observe(self, seq: Optional[int]):
+        if seq is None or seq <= self.version:
+            return
+        self._seen_seqs.add(seq)
+        # La version n'avance que sur une suite continue : un trou signale une écriture inconnue
+        while self.version + 1 in self._seen_seqs:
+            self._seen_seqs.remove(self.version + 1)
+            self.version += 1
+            self._behind_since = None
+
+    def _upsert(self, reminder: dict):
+        reminder_id = reminder["id"]
+        self._remove(reminder_id)
+        if reminder.get("status") != "scheduled":
+            return
+        try:
+            due_at = parse_datetime(reminder["datetime_iso"], reminder.get("timezone")).astimezone(pytz.utc).replace(tzinfo=None)
+        except (KeyError, TypeError, ValueError):
+            return
+        if not self.covered_from <= due_at < self.covered_to:
+            return
+        bisect.insort(self._order, (due_at, reminder_id))
+        self._docs[reminder_id] = {name: reminder.get(name) for name in self.fields}
+        self._due[reminder_id] = due_at
+
+    def _remove(self, reminder_id: str):
+        due_at = self._due.pop(reminder_id, None)
+        if due_at is None:
+            return
+        del self._docs[reminder_id]
+        index = bisect.bisect_left(self._order, (due_at, reminder_id))
+        if index < len(self._order) and self._order[index] == (due_at, reminder_id):
+            del self._order[index]
+
+    # Réconciliation
+
+    async def reconcile(self, current_version) -> bool:
+        """Recharge la fenêtre depuis MongoDB ; `current_version` lit la version de la collection"""
+        # Lue avant le chargement : une écriture concurrente rendra la version courante plus récente
+        version = await current_version()
+        now = datetime.utcnow()
+        covered_from, covered_to = now - self.lookback, now + self.window
+        projection = {"_id": 0, "due_at": 1, **{name: 1 for name in self.fields}}
+        cursor = self.collection.find(
+            {"status": "scheduled", "due_at": {"$gte": covered_from, "$lt": covered_to}}, projection
+        ).sort([("due_at", 1), ("id", 1)]).limit(self.max_entries + 1)
+        self._backlog = []
+        try:
+            docs = await cursor.to_list(self.max_entries + 1)
+        finally:
+            backlog, self._backlog = self._backlog, None
+        if len(docs) > self.max_entries:
+            logger.warning(f"Upcoming window holds more than {self.max_entries} reminders, cache disabled")
+            self.version = -1
+            return False
+        self._order = [(doc.pop("due_at"), doc["id"]) for doc in docs]
+        self._docs = {doc["id"]: doc for doc in docs}
+        self._due = {reminder_id: due_at for due_at, reminder_id in self._order}
+        self.covered_from, self.covered_to = covered_from, covered_to
+        self._seen_seqs = set()
+        self.version = version
+        self._behind_since = None
+        for event in backlog:
+            self.apply(event)
+        self.reconciles += 1
+        return True
+
+    def start(self, current_version):
+        self._wake = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run(current_version))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _request_reconcile(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self, current_version):
+        while True:
+            started = time.monotonic()
+            try:
+                await self.reconcile(current_version)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Upcoming cache reconcile failed: {str(e)}")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.reconcile_seconds)
+            except asyncio.TimeoutError:
+                pass
+            # Au plus une réconciliation anticipée par seconde
+            await asyncio.sleep(max(0.0, 1.0 - (time.monotonic() - started)))
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._docs),
+            "version": self.version,
+            "covered_from": self.covered_from.isoformat() + "Z" if self.covered_from else None,
+            "covered_to": self.covered_to.isoformat() + "Z" if self.covered_to else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "reconciles": self.reconciles,
+        }
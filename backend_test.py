@@ -148,6 +148,34 @@ class BackendTester:
             print(f"❌ Erreur: {e}")
             return False
     
+    def test_parse_messages_batch(self):
+        """Test parsing de plusieurs messages en un seul appel"""
+        print("\n=== Test Parse Messages - Batch ===")
+        try:
+            payload = {"messages": ["demain 15h appeler Paul", "le 20 novembre dentiste à 9h"]}
+            response = self.session.post(f"{API_BASE}/parse-messages", json=payload)
+            print(f"Status: {response.status_code}")
+            
+            if response.status_code == 200:
+                data = response.json()
+                print(f"Response: {json.dumps(data, indent=2, ensure_ascii=False)}")
+                
+                # Vérifications
+                assert len(data["results"]) == 2, "Nombre de résultats incorrect"
+                assert [r["index"] for r in data["results"]] == [0, 1], "Ordre des résultats incorrect"
+                assert all(r["parsed"] or r["error"] for r in data["results"]), "Résultat vide"
+                
+                print("✅ Parse messages batch: OK")
+                return True
+            else:
+                print(f"❌ Erreur HTTP: {response.status_code}")
+                print(f"Response: {response.text}")
+                return False
+                
+        except Exception as e:
+            print(f"❌ Erreur: {e}")
+            return False
+    
     def test_create_reminder(self):
         """Test création d'un rappel"""
         print("\n=== Test Create Reminder ===")
@@ -424,6 +452,7 @@ class BackendTester:
         results['parse_relative'] = self.test_parse_message_relative_date()
         results['parse_description'] = self.test_parse_message_with_description()
         results['parse_ambiguous'] = self.test_parse_message_ambiguous()
+        results['parse_batch'] = self.test_parse_messages_batch()
         
         # Test création de rappel
         create_success, reminder_id = self.test_create_reminder()
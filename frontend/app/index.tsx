@@ -40,7 +40,7 @@ interface Message {
 export default function Index() {
   const [message, setMessage] = useState('');
   const [chatMessages, setChatMessages] = useState<Message[]>([]);
-  const [conversationHistory, setConversationHistory] = useState<Array<{ role: string; content: string }>>([]);
+  const [sessionId, setSessionId] = useState<string | null>(null);
   const [parsedReminder, setParsedReminder] = useState<ParsedReminder | null>(null);
   const [showConfirmation, setShowConfirmation] = useState(false);
   const [loading, setLoading] = useState(false);
@@ -121,27 +121,17 @@ export default function Index() {
     const userMessage = message;
     addChatMessage('user', userMessage);
 
-    // Create updated history with current message BEFORE API call
-    const updatedHistory = [...conversationHistory, { role: 'user', content: userMessage }];
-
-    // Update conversation history state
-    setConversationHistory(updatedHistory);
-
     setMessage('');
     setLoading(true);
 
     try {
-      // Send the UPDATED history to the backend
-      const chatResponse = await api.chatWithAssistant(userMessage, updatedHistory);
+      // The backend keeps the conversation context for this session
+      const chatResponse = await api.chatWithAssistant(userMessage, sessionId);
 
       // Add assistant response to chat
       addChatMessage('assistant', chatResponse.response, chatResponse.suggestions || undefined);
 
-      // Update conversation history with assistant response
-      setConversationHistory((prev) => [
-        ...prev,
-        { role: 'assistant', content: chatResponse.response },
-      ]);
+      setSessionId(chatResponse.session_id);
 
       // Set current suggestions
       setCurrentSuggestions(chatResponse.suggestions);
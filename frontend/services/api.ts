@@ -17,13 +17,15 @@ export interface ChatResponse {
   type: 'question' | 'suggestion' | 'confirmation' | 'multiple_tasks';
   suggestions: string[] | null;
   parsed_reminders: ParsedReminder[] | null;
+  session_id: string | null;
 }
 
 export const chatWithAssistant = async (
   message: string,
-  conversation_history: Array<{ role: string; content: string }>
+  session_id: string | null
 ): Promise<ChatResponse> => {
-  const response = await api.post('/chat', { message, conversation_history });
+  // Le serveur conserve le contexte de la conversation : on n'envoie que l'identifiant de session
+  const response = await api.post('/chat', { message, session_id });
   return response.data;
 };
 
@@ -32,18 +34,119 @@ export const parseMessage = async (message: string): Promise<ParsedReminder> =>
   return response.data;
 };
 
+export interface BatchParseItem {
+  index: number;
+  message: string;
+  parsed: ParsedReminder | null;
+  error: string | null;
+}
+
+export const parseMessages = async (messages: string[]): Promise<BatchParseItem[]> => {
+  const response = await api.post('/parse-messages', { messages });
+  return response.data.results;
+};
+
 export const createReminder = async (reminder: ReminderCreate): Promise<Reminder> => {
   // Timeout plus long pour gérer le cold start de Render (plan gratuit)
   const response = await api.post('/reminders', reminder, { timeout: 60000 });
   return response.data;
 };
 
-export const getReminders = async (status?: string): Promise<Reminder[]> => {
-  const params = status ? { status } : {};
-  const response = await api.get('/reminders', { params });
+export interface BulkCreateItem {
+  index: number;
+  reminder: Reminder | null;
+  error: string | null;
+}
+
+export const createReminders = async (reminders: ReminderCreate[]): Promise<BulkCreateItem[]> => {
+  const response = await api.post('/reminders/bulk', reminders, { timeout: 60000 });
+  return response.data.results;
+};
+
+// Dernière liste reçue par filtre, revalidée avec If-None-Match (304 si rien n'a changé).
+// L'ETag de la première page suit la version de toute la collection : un 304 vaut pour toutes les pages
+const remindersCache = new Map<string, { etag: string; reminders: Reminder[] }>();
+
+// `from` / `to` (ISO, `to` exclu) limitent la liste à une plage, ex. la vue « aujourd'hui ».
+// Les pages suivantes (en-tête X-Next-Cursor) sont chargées jusqu'à la dernière
+export const getReminders = async (status?: string, from?: string, to?: string): Promise<Reminder[]> => {
+  const params = { ...(status ? { status } : {}), ...(from ? { from } : {}), ...(to ? { to } : {}) };
+  const cacheKey = `${status || ''}|${from || ''}|${to || ''}`;
+  const cached = remindersCache.get(cacheKey);
+  const response = await api.get('/reminders', {
+    params,
+    headers: cached ? { 'If-None-Match': cached.etag } : {},
+    validateStatus: (code) => (code >= 200 && code < 300) || code === 304,
+  });
+  if (response.status === 304 && cached) {
+    return cached.reminders;
+  }
+  const reminders: Reminder[] = [...response.data];
+  let cursor: string | undefined = response.headers['x-next-cursor'];
+  while (cursor) {
+    const page = await api.get('/reminders', { params: { ...params, cursor } });
+    reminders.push(...page.data);
+    cursor = page.headers['x-next-cursor'];
+  }
+  const etag = response.headers['etag'];
+  if (etag) {
+    remindersCache.set(cacheKey, { etag, reminders });
+  }
+  return reminders;
+};
+
+export interface ReminderChanges {
+  version: number;
+  changed: Reminder[];
+  deleted: string[];
+  has_more: boolean;
+}
+
+// Modifications depuis `since` ; repasser `version` au prochain appel
+export const getReminderChanges = async (since: number): Promise<ReminderChanges> => {
+  const response = await api.get('/reminders/changes', { params: { since } });
   return response.data;
 };
 
+export interface AgendaDay {
+  date: string;
+  total: number;
+  counts: Record<string, number>;
+  reminders: Reminder[];
+}
+
+export interface Agenda {
+  start: string;
+  end: string;
+  days: AgendaDay[];
+  counts: Record<string, number>;
+}
+
+// Rappels regroupés par jour côté serveur (défaut : aujourd'hui + 7 jours)
+export const getAgenda = async (params: { from?: string; to?: string; status?: string; per_day?: number } = {}): Promise<Agenda> => {
+  const response = await api.get('/reminders/agenda', { params });
+  return response.data;
+};
+
+// Occurrences d'un rappel récurrent dans une fenêtre (ISO) ; défaut : les 31 prochains jours
+export const getReminderOccurrences = async (id: string, start?: string, end?: string): Promise<string[]> => {
+  const response = await api.get(`/reminders/${id}/occurrences`, { params: { start, end } });
+  return response.data.occurrences;
+};
+
+export type ReminderEvent =
+  | { type: 'hello'; version: number }
+  | { type: 'created' | 'updated' | 'due'; seq: number; reminder: Reminder }
+  | { type: 'deleted'; seq: number; id: string }
+  | { type: 'resync' };
+
+// Flux temps réel /api/ws ; renvoie la fonction de fermeture
+export const subscribeToReminderEvents = (onEvent: (event: ReminderEvent) => void): (() => void) => {
+  const socket = new WebSocket(API_BASE_URL.replace(/^http/, 'ws') + '/api/ws');
+  socket.onmessage = (message) => onEvent(JSON.parse(message.data));
+  return () => socket.close();
+};
+
 export const deleteReminder = async (id: string): Promise<void> => {
   await api.delete(`/reminders/${id}`);
 };
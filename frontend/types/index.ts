@@ -19,6 +19,7 @@ export interface Reminder {
   recurrence: string | null;
   created_at: string;
   updated_at: string;
+  version?: number;
 }
 
 export interface ReminderCreate {
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Les modules du backend sont importés à plat, comme depuis backend/ (uvicorn server:app)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
@@ -0,0 +1,78 @@
+"""
+Tests du contrôle d'admission des appels au LLM (admission)
+"""
+import asyncio
+import unittest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+class AdmissionTest(unittest.IsolatedAsyncioTestCase):
+    async def hold(self, controller: AdmissionController, client: str, order: list, release: asyncio.Event):
+        async with controller.slot(client):
+            order.append(client)
+            await release.wait()
+
+    async def test_fair_queue_alternates_clients(self):
+        """Un client qui inonde la file n'affame pas les autres : service en tourniquet par client"""
+        controller = AdmissionController(max_concurrency=1, max_queue=10, max_queue_per_client=5)
+        order = []
+        release = asyncio.Event()
+        tasks = [asyncio.ensure_future(self.hold(controller, "busy", order, release))]
+        await asyncio.sleep(0)
+        for client in ("busy", "busy", "busy", "calm", "other"):
+            tasks.append(asyncio.ensure_future(self.hold(controller, client, order, release)))
+            await asyncio.sleep(0)
+        self.assertEqual(controller.stats()["queued"], 5)
+
+        release.set()
+        await asyncio.gather(*tasks)
+        self.assertEqual(order, ["busy", "busy", "calm", "other", "busy", "busy"])
+        self.assertEqual(controller.stats()["active"], 0)
+
+    async def test_full_queue_is_rejected_with_retry_after(self):
+        """File pleine : rejet immédiat avec un délai de nouvelle tentative (503 + Retry-After côté API)"""
+        controller = AdmissionController(max_concurrency=1, max_queue=2, max_queue_per_client=2)
+        release = asyncio.Event()
+        tasks = [asyncio.ensure_future(self.hold(controller, client, [], release)) for client in ("a", "b", "c")]
+        await asyncio.sleep(0)
+
+        with self.assertRaises(AdmissionRejected) as rejected:
+            async with controller.slot("d"):
+                pass
+        self.assertEqual(rejected.exception.reason, "queue_full")
+        self.assertGreaterEqual(rejected.exception.retry_after, 1)
+        self.assertEqual(controller.stats()["rejected"], {"queue_full": 1})
+        release.set()
+        await asyncio.gather(*tasks)
+
+    async def test_client_queue_limit(self):
+        controller = AdmissionController(max_concurrency=1, max_queue=10, max_queue_per_client=1)
+        release = asyncio.Event()
+        tasks = [asyncio.ensure_future(self.hold(controller, "a", [], release)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with self.assertRaises(AdmissionRejected) as rejected:
+            async with controller.slot("a"):
+                pass
+        self.assertEqual(rejected.exception.reason, "client_queue_full")
+        release.set()
+        await asyncio.gather(*tasks)
+
+    async def test_wait_timeout(self):
+        controller = AdmissionController(max_concurrency=1)
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(self.hold(controller, "a", [], release))
+        await asyncio.sleep(0)
+
+        with self.assertRaises(AdmissionRejected) as rejected:
+            async with controller.slot("b", max_wait=0.01):
+                pass
+        self.assertEqual(rejected.exception.reason, "wait_timeout")
+        self.assertEqual(controller.stats()["queued"], 0)
+        release.set()
+        await holder
+
+
+if __name__ == "__main__":
+    unittest.main()
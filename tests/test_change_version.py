@@ -0,0 +1,68 @@
+"""
+Tests du seuil de validation des séquences de modification (change_version)
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+from change_version import ChangeVersion
+
+
+class ChangeVersionTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.counters = AsyncMongoMockClient()["test"]["counters"]
+        self.version = ChangeVersion(self.counters, "reminders", pending_timeout_seconds=30)
+
+    async def test_first_allocation_creates_the_counter(self):
+        self.assertEqual(await self.version.committed(), 0)
+        self.assertEqual(await self.version.allocate(), 1)
+        self.assertEqual(await self.version.allocate(3), 4)
+        counter = await self.counters.find_one({"_id": "reminders"})
+        self.assertEqual(counter["version"], 4)
+        self.assertEqual([entry["seq"] for entry in counter["pending"]], [1, 2, 3, 4])
+
+    async def test_pending_seq_holds_the_watermark(self):
+        async with self.version.reserve() as seq:
+            self.assertEqual(seq, 1)
+            self.assertEqual(await self.version.committed(), 0)
+        self.assertEqual(await self.version.committed(), 1)
+
+    async def test_out_of_order_release(self):
+        """Une écriture plus récente terminée avant une plus ancienne n'avance pas le seuil"""
+        first = await self.version.allocate()
+        second = await self.version.allocate()
+        third = await self.version.allocate()
+        await self.version.release([third])
+        self.assertEqual(await self.version.committed(), first - 1)
+        await self.version.release([first])
+        self.assertEqual(await self.version.committed(), second - 1)
+        await self.version.release([second])
+        self.assertEqual(await self.version.committed(), third)
+
+    async def test_expired_pending_seq_is_ignored(self):
+        """Une séquence jamais libérée (worker arrêté) ne bloque le seuil que `pending_timeout_seconds`"""
+        abandoned = datetime.utcnow() - timedelta(seconds=60)
+        await self.counters.insert_one({"_id": "reminders", "version": 5, "pending": [{"seq": 5, "at": abandoned}]})
+        self.assertEqual(await self.version.committed(), 5)
+
+        async with self.version.reserve() as seq:
+            self.assertEqual(seq, 6)
+            self.assertEqual(await self.version.committed(), 5)
+        counter = await self.counters.find_one({"_id": "reminders"})
+        self.assertEqual(counter["pending"], [])
+        self.assertEqual(self.version.stats()["expired"], 1)
+        self.assertEqual(await self.version.committed(), 6)
+
+    async def test_current_sees_local_writes(self):
+        version = ChangeVersion(self.counters, "reminders", max_age_seconds=60)
+        self.assertEqual(await version.current(), 0)
+        async with version.reserve():
+            pass
+        self.assertEqual(await version.current(), 1)
+        self.assertEqual(await version.current(), 1)
+        self.assertEqual(version.stats()["snapshot_hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Tests du parseur local des messages en français (french_parser)
+"""
+import unittest
+from datetime import date, datetime, time
+
+import pytz
+
+from french_parser import (
+    CONFIDENCE_COMPLETE,
+    CONFIDENCE_CONFLICT,
+    CONFIDENCE_LEFTOVER_TEMPORAL,
+    CONFIDENCE_TIME_ONLY,
+    parse_french_reminder,
+    parse_slot_date,
+    parse_slot_time,
+    task_title,
+)
+
+PARIS_TZ = pytz.timezone("Europe/Paris")
+# Vendredi 16 octobre 2026, 9h (heure d'été)
+NOW = PARIS_TZ.localize(datetime(2026, 10, 16, 9, 0))
+
+
+class ParseFrenchReminderTest(unittest.TestCase):
+    def test_complete_message(self):
+        """Tâche, date relative et heure : réponse locale sans LLM"""
+        parsed = parse_french_reminder("dentiste demain 10h", NOW)
+        self.assertEqual(parsed.title, "Dentiste")
+        self.assertEqual(parsed.date, "2026-10-17")
+        self.assertEqual(parsed.time, "10:00")
+        self.assertEqual(parsed.datetime_iso, "2026-10-17T10:00:00+02:00")
+        self.assertFalse(parsed.is_ambiguous)
+        self.assertEqual(parsed.confidence, 0.95)
+
+    def test_full_date_and_title(self):
+        parsed = parse_french_reminder("le 20 novembre rendez-vous chez le médecin à 9h", NOW)
+        self.assertEqual(parsed.title, "Rendez-vous chez le médecin")
+        self.assertEqual(parsed.datetime_iso, "2026-11-20T09:00:00+01:00")
+        self.assertEqual(parsed.confidence, CONFIDENCE_COMPLETE)
+
+    def test_time_range_is_a_conflict(self):
+        """Deux heures différentes : ambigu, confiance trop basse pour éviter le LLM"""
+        parsed = parse_french_reminder("cours de 10h à 12h demain", NOW)
+        self.assertTrue(parsed.is_ambiguous)
+        self.assertEqual(parsed.confidence, CONFIDENCE_CONFLICT)
+
+    def test_two_dates_are_a_conflict(self):
+        parsed = parse_french_reminder("mardi 10h et jeudi 10h", NOW)
+        self.assertTrue(parsed.is_ambiguous)
+        self.assertLessEqual(parsed.confidence, CONFIDENCE_CONFLICT)
+
+    def test_dst_end(self):
+        """Après le passage à l'heure d'hiver (25 octobre 2026), le décalage devient +01:00"""
+        parsed = parse_french_reminder("le 30 octobre à 9h appeler Paul", NOW)
+        self.assertEqual(parsed.title, "Appeler Paul")
+        self.assertEqual(parsed.datetime_iso, "2026-10-30T09:00:00+01:00")
+
+    def test_dst_start(self):
+        now = PARIS_TZ.localize(datetime(2026, 3, 28, 20, 0))
+        parsed = parse_french_reminder("demain 10h dentiste", now)
+        self.assertEqual(parsed.datetime_iso, "2026-03-29T10:00:00+02:00")
+
+    def test_relative_days_cross_month_end(self):
+        parsed = parse_french_reminder("dans 20 jours 8h vaccin", NOW)
+        self.assertEqual(parsed.date, "2026-11-05")
+        self.assertEqual(parsed.datetime_iso, "2026-11-05T08:00:00+01:00")
+
+    def test_past_month_day_rolls_to_next_year(self):
+        parsed = parse_french_reminder("rdv 3 avril 10h", NOW)
+        self.assertEqual(parsed.date, "2027-04-03")
+
+    def test_invalid_day_of_month_is_not_a_date(self):
+        """Un 31 novembre n'existe pas : les chiffres restent dans le titre et la confiance baisse"""
+        parsed = parse_french_reminder("le 31/11 à 9h facture", NOW)
+        self.assertNotEqual(parsed.date, "2026-11-31")
+        self.assertLess(parsed.confidence, CONFIDENCE_COMPLETE)
+
+    def test_time_only(self):
+        """Heure seule : aujourd'hui si elle est à venir, sinon demain"""
+        later = parse_french_reminder("18h dîner", NOW)
+        self.assertEqual(later.date, "2026-10-16")
+        self.assertEqual(later.confidence, CONFIDENCE_TIME_ONLY)
+        passed = parse_french_reminder("8h sport", NOW)
+        self.assertEqual(passed.date, "2026-10-17")
+
+    def test_date_only_is_ambiguous(self):
+        parsed = parse_french_reminder("lundi réunion", NOW)
+        self.assertEqual(parsed.date, "2026-10-19")
+        self.assertIsNone(parsed.time)
+        self.assertTrue(parsed.is_ambiguous)
+
+    def test_unread_temporal_words_lower_confidence(self):
+        """Mots temporels non compris : la date locale est douteuse, le LLM doit trancher"""
+        for message in ("dentiste lundi 10h la semaine prochaine", "réunion mardi en huit 10h", "garage jeudi soir 19h"):
+            with self.subTest(message=message):
+                parsed = parse_french_reminder(message, NOW)
+                self.assertLessEqual(parsed.confidence, CONFIDENCE_LEFTOVER_TEMPORAL)
+
+    def test_recognised_temporal_words_keep_confidence(self):
+        for message in ("lundi prochain 10h dentiste", "rdv ce soir 20h cinéma", "demain 8h du matin sport"):
+            with self.subTest(message=message):
+                self.assertEqual(parse_french_reminder(message, NOW).confidence, CONFIDENCE_COMPLETE)
+
+    def test_no_temporal_expression(self):
+        self.assertIsNone(parse_french_reminder("appeler maman", NOW))
+
+
+class SlotAnswersTest(unittest.TestCase):
+    def test_task_title(self):
+        self.assertEqual(task_title("appeler maman", NOW), "Appeler maman")
+        self.assertEqual(task_title("courses samedi", NOW), "Courses")
+        self.assertEqual(task_title("9h30", NOW), "")
+
+    def test_slot_time(self):
+        self.assertEqual(parse_slot_time("14", NOW), time(14, 0))
+        self.assertEqual(parse_slot_time("9h30", NOW), time(9, 30))
+        self.assertIsNone(parse_slot_time("lundi", NOW))
+
+    def test_slot_date(self):
+        self.assertEqual(parse_slot_date("lundi", NOW), date(2026, 10, 19))
+        self.assertIsNone(parse_slot_date("demain ou lundi", NOW))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+"""
+Tests de la politique de résilience des appels au LLM (llm_resilience)
+"""
+import asyncio
+import time
+import unittest
+
+import httpx
+import openai
+
+from llm_resilience import (
+    CircuitOpenError,
+    DeadlineExceededError,
+    ResilientCaller,
+    UpstreamUnavailableError,
+    deadline_budget,
+    is_retryable,
+    remaining_budget,
+)
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+def status_error(status_code: int) -> openai.APIStatusError:
+    return openai.APIStatusError(f"http {status_code}", response=httpx.Response(status_code, request=REQUEST), body=None)
+
+
+async def hang():
+    await asyncio.sleep(10)
+
+
+async def answer():
+    return "ok"
+
+
+class IsRetryableTest(unittest.TestCase):
+    def test_transient_errors(self):
+        for error in (asyncio.TimeoutError(), openai.APIConnectionError(request=REQUEST),
+                      openai.APITimeoutError(request=REQUEST), status_error(429), status_error(503)):
+            with self.subTest(error=type(error).__name__):
+                self.assertTrue(is_retryable(error))
+
+    def test_other_errors(self):
+        for error in (status_error(400), status_error(401), TypeError("bug"), KeyError("choices"), ValueError()):
+            with self.subTest(error=type(error).__name__):
+                self.assertFalse(is_retryable(error))
+
+
+class RetryTest(unittest.IsolatedAsyncioTestCase):
+    async def test_bug_is_not_retried_nor_counted(self):
+        """Une erreur locale remonte telle quelle, sans nouvelle tentative ni échec du disjoncteur"""
+        caller = ResilientCaller(failure_threshold=1)
+        attempts = []
+
+        async def buggy():
+            attempts.append(1)
+            raise KeyError("choices")
+
+        with self.assertRaises(KeyError):
+            await caller.call(buggy)
+        self.assertEqual(len(attempts), 1)
+        self.assertEqual(caller.state, "closed")
+        self.assertEqual(caller.stats()["failures"], 0)
+
+    async def test_transient_errors_are_retried(self):
+        caller = ResilientCaller(backoff_seconds=0.001)
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise status_error(503)
+            return "ok"
+
+        self.assertEqual(await caller.call(flaky), "ok")
+        self.assertEqual(caller.stats()["retries"], 2)
+
+    async def test_exhausted_attempts(self):
+        caller = ResilientCaller(max_attempts=2, backoff_seconds=0.001)
+
+        async def down():
+            raise openai.APIConnectionError(request=REQUEST)
+
+        with self.assertRaises(UpstreamUnavailableError):
+            await caller.call(down)
+        self.assertEqual(caller.stats()["failures"], 1)
+
+
+class BreakerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_full_cycle(self):
+        """closed -> open après les échecs consécutifs -> half_open après le délai -> closed si l'essai réussit"""
+        caller = ResilientCaller(timeout_seconds=0.01, max_attempts=1, failure_threshold=2, reset_seconds=0.05)
+        for _ in range(2):
+            self.assertEqual(caller.state, "closed")
+            with self.assertRaises(UpstreamUnavailableError):
+                await caller.call(hang)
+        self.assertEqual(caller.state, "open")
+        with self.assertRaises(CircuitOpenError):
+            await caller.call(answer)
+
+        await asyncio.sleep(0.06)
+        probe = asyncio.ensure_future(caller.call(hang))
+        await asyncio.sleep(0)
+        self.assertEqual(caller.state, "half_open")
+        # Un seul appel d'essai à la fois
+        with self.assertRaises(CircuitOpenError):
+            await caller.call(answer)
+        with self.assertRaises(UpstreamUnavailableError):
+            await probe
+        self.assertEqual(caller.state, "open")
+
+        await asyncio.sleep(0.06)
+        self.assertEqual(await caller.call(answer), "ok")
+        self.assertEqual(caller.state, "closed")
+        self.assertEqual(caller.stats()["opened"], 2)
+
+
+class HedgeTest(unittest.IsolatedAsyncioTestCase):
+    async def test_hedged_request_wins(self):
+        """Au-delà du p95 des latences, une requête doublée est lancée et la plus rapide l'emporte"""
+        caller = ResilientCaller(hedge_min_samples=5)
+        for _ in range(5):
+            caller.latencies.add(0.01)
+        started = []
+
+        async def slow_then_fast():
+            started.append(1)
+            await asyncio.sleep(5 if len(started) == 1 else 0.01)
+            return len(started)
+
+        t0 = time.monotonic()
+        self.assertEqual(await caller.call(slow_then_fast), 2)
+        self.assertLess(time.monotonic() - t0, 1)
+        self.assertEqual((caller.stats()["hedges"], caller.stats()["hedge_wins"]), (1, 1))
+
+    async def test_no_hedge_without_history(self):
+        caller = ResilientCaller(hedge_min_samples=5)
+        self.assertEqual(await caller.call(answer), "ok")
+        self.assertEqual(caller.stats()["hedges"], 0)
+
+
+class DeadlineTest(unittest.IsolatedAsyncioTestCase):
+    async def test_budget_bounds_attempts_and_backoff(self):
+        """Les tentatives et le backoff puisent dans le même budget : l'échec arrive avant l'échéance du client"""
+        caller = ResilientCaller(timeout_seconds=5, max_attempts=5, backoff_seconds=1)
+        t0 = time.monotonic()
+        with deadline_budget(0.1):
+            with self.assertRaises(UpstreamUnavailableError):
+                await caller.call(hang)
+        self.assertLess(time.monotonic() - t0, 0.5)
+        self.assertGreaterEqual(caller.stats()["deadline_exceeded"], 1)
+
+    async def test_spent_budget_skips_the_call(self):
+        caller = ResilientCaller()
+        with deadline_budget(0):
+            with self.assertRaises(DeadlineExceededError):
+                await caller.call(answer)
+        self.assertEqual(caller.stats()["calls"], 0)
+
+    def test_nested_budget_keeps_the_closest_deadline(self):
+        self.assertIsNone(remaining_budget())
+        with deadline_budget(0.5):
+            with deadline_budget(10):
+                self.assertLessEqual(remaining_budget(), 0.5)
+        self.assertIsNone(remaining_budget())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+Tests de la limitation de débit par client (rate_limit)
+"""
+import unittest
+from unittest import mock
+
+from rate_limit import MemoryBucketStore, RateLimiter, TokenBucketPolicy
+
+POLICY = TokenBucketPolicy("llm", rate_per_second=1.0, burst=3)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class MemoryBucketStoreTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch("rate_limit.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.store = MemoryBucketStore()
+        self.limiter = RateLimiter(self.store, [POLICY])
+
+    async def test_burst_then_refill(self):
+        for _ in range(3):
+            self.assertEqual(await self.limiter.check("llm", "a"), (True, 0))
+        self.assertEqual(await self.limiter.check("llm", "a"), (False, 1))
+        # Autre client : seau séparé
+        self.assertEqual(await self.limiter.check("llm", "b"), (True, 0))
+
+        self.clock.now += 1
+        self.assertEqual(await self.limiter.check("llm", "a"), (True, 0))
+        self.assertFalse((await self.limiter.check("llm", "a"))[0])
+        # La recharge plafonne à la rafale
+        self.clock.now += 60
+        self.assertEqual([(await self.limiter.check("llm", "a"))[0] for _ in range(4)], [True, True, True, False])
+
+    async def test_debt_delays_the_next_requests(self):
+        """Un coût supérieur aux jetons restants passe, puis la dette retarde les requêtes suivantes"""
+        self.assertEqual(await self.store.take(POLICY, "a", cost=5), (True, -2))
+        allowed, retry_after = await self.limiter.check("llm", "a")
+        self.assertFalse(allowed)
+        self.assertEqual(retry_after, 3)
+        self.clock.now += 2
+        self.assertFalse((await self.limiter.check("llm", "a"))[0])
+        self.clock.now += 1
+        self.assertTrue((await self.limiter.check("llm", "a"))[0])
+
+    async def test_idle_buckets_are_evicted(self):
+        """Un seau resté inactif le temps d'une recharge complète équivaut à un seau neuf : il est évincé"""
+        await self.store.take(POLICY, "idle")
+        self.clock.now += 1
+        await self.store.take(POLICY, "active")
+        self.assertEqual(self.store.stats()["buckets"], 2)
+
+        self.clock.now += POLICY.refill_seconds - 0.5
+        await self.store.take(POLICY, "active")
+        self.assertEqual(self.store.stats(), {"backend": "memory", "buckets": 1, "evictions": 1})
+
+    async def test_table_is_bounded(self):
+        store = MemoryBucketStore(max_buckets=2)
+        for client in ("a", "b", "c"):
+            await store.take(POLICY, client)
+        self.assertEqual(store.stats()["buckets"], 2)
+        self.assertEqual(store.stats()["evictions"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
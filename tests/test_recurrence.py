@@ -0,0 +1,118 @@
+"""
+Tests du moteur de récurrence (recurrence)
+"""
+import itertools
+import unittest
+
+from recurrence import DAILY, WEEKLY, next_occurrence, occurrences, parse_datetime, parse_rule
+
+TIMEZONE = "Europe/Paris"
+
+
+def first_occurrences(rule: str, start: str, count: int = 10, since: str = None):
+    found = occurrences(parse_rule(rule), parse_datetime(start), TIMEZONE, parse_datetime(since) if since else None)
+    return [occurrence.isoformat() for occurrence in itertools.islice(found, count)]
+
+
+class ParseRuleTest(unittest.TestCase):
+    def test_keywords(self):
+        self.assertEqual(parse_rule("tous les jours").freq, DAILY)
+        self.assertEqual(parse_rule("chaque lundi").by_day, (0,))
+        self.assertEqual(parse_rule("jours ouvrés").by_day, (0, 1, 2, 3, 4))
+        self.assertEqual(parse_rule("FREQ=WEEKLY;BYDAY=WE,MO;INTERVAL=2").freq, WEEKLY)
+
+    def test_not_recurring(self):
+        self.assertIsNone(parse_rule(None))
+        self.assertIsNone(parse_rule("  "))
+
+    def test_unsupported_rules(self):
+        for text in ("FREQ=HOURLY", "n'importe quoi", "FREQ=DAILY;BYSETPOS=1", "FREQ=WEEKLY;BYDAY=XX"):
+            with self.assertRaises(ValueError):
+                parse_rule(text)
+
+
+class OccurrencesTest(unittest.TestCase):
+    def test_daily_keeps_local_time_across_dst_end(self):
+        self.assertEqual(first_occurrences("daily", "2026-10-24T09:00:00+02:00", 3), [
+            "2026-10-24T09:00:00+02:00",
+            "2026-10-25T09:00:00+01:00",
+            "2026-10-26T09:00:00+01:00",
+        ])
+
+    def test_nonexistent_local_time_on_dst_start(self):
+        """2h30 n'existe pas le 29 mars 2026 : l'occurrence est décalée à 3h30"""
+        self.assertEqual(first_occurrences("daily", "2026-03-28T02:30:00+01:00", 3), [
+            "2026-03-28T02:30:00+01:00",
+            "2026-03-29T03:30:00+02:00",
+            "2026-03-30T02:30:00+02:00",
+        ])
+
+    def test_biweekly_weekdays_across_dst_start(self):
+        self.assertEqual(first_occurrences("FREQ=WEEKLY;BYDAY=MO,WE;INTERVAL=2", "2026-03-16T09:00:00+01:00", 6), [
+            "2026-03-16T09:00:00+01:00",
+            "2026-03-18T09:00:00+01:00",
+            "2026-03-30T09:00:00+02:00",
+            "2026-04-01T09:00:00+02:00",
+            "2026-04-13T09:00:00+02:00",
+            "2026-04-15T09:00:00+02:00",
+        ])
+
+    def test_working_days_skip_weekend(self):
+        self.assertEqual(first_occurrences("jours ouvrés", "2026-10-16T09:00:00+02:00", 2), [
+            "2026-10-16T09:00:00+02:00",
+            "2026-10-19T09:00:00+02:00",
+        ])
+
+    def test_monthly_skips_short_months(self):
+        """Comme RRULE : un rappel du 31 n'a pas lieu les mois plus courts"""
+        self.assertEqual(first_occurrences("FREQ=MONTHLY", "2026-01-31T08:00:00+01:00", 3), [
+            "2026-01-31T08:00:00+01:00",
+            "2026-03-31T08:00:00+02:00",
+            "2026-05-31T08:00:00+02:00",
+        ])
+
+    def test_yearly_on_february_29(self):
+        self.assertEqual(first_occurrences("yearly", "2024-02-29T09:00:00+01:00", 2), [
+            "2024-02-29T09:00:00+01:00",
+            "2028-02-29T09:00:00+01:00",
+        ])
+
+    def test_count(self):
+        self.assertEqual(len(first_occurrences("FREQ=DAILY;COUNT=3", "2026-10-16T09:00:00+02:00")), 3)
+
+    def test_until_date_covers_the_whole_day(self):
+        self.assertEqual(first_occurrences("FREQ=DAILY;UNTIL=20261019", "2026-10-16T09:00:00+02:00")[-1],
+                         "2026-10-19T09:00:00+02:00")
+
+    def test_unknown_timezone(self):
+        with self.assertRaises(ValueError):
+            next(occurrences(parse_rule("daily"), parse_datetime("2026-10-16T09:00:00+02:00"), "Mars/Olympus"))
+
+    def test_since(self):
+        self.assertEqual(first_occurrences("chaque lundi", "2026-10-16T09:00:00+02:00", 1, since="2026-10-20T00:00:00+02:00"),
+                         ["2026-10-26T09:00:00+01:00"])
+
+
+class NextOccurrenceTest(unittest.TestCase):
+    RULE = "FREQ=WEEKLY;BYDAY=MO,WE;INTERVAL=2"
+    START = "2026-03-16T09:00:00+01:00"
+
+    def next_after(self, rule: str, start: str, after: str):
+        upcoming = next_occurrence(parse_rule(rule), parse_datetime(start), TIMEZONE, parse_datetime(after))
+        return upcoming.isoformat() if upcoming else None
+
+    def test_strictly_after(self):
+        self.assertEqual(self.next_after(self.RULE, self.START, "2026-03-18T09:00:00+01:00"), "2026-03-30T09:00:00+02:00")
+
+    def test_long_gap_keeps_the_interval(self):
+        """Après une longue interruption, la série reprend sur les bonnes semaines"""
+        # 2029-12-31 est un lundi de semaine paire depuis le début de la série
+        self.assertEqual(self.next_after(self.RULE, self.START, "2030-01-01T00:00:00+01:00"), "2030-01-02T09:00:00+01:00")
+
+    def test_finished_series(self):
+        self.assertIsNone(self.next_after("FREQ=DAILY;COUNT=3", "2026-10-16T09:00:00+02:00", "2026-10-18T09:00:00+02:00"))
+        self.assertIsNone(self.next_after("FREQ=DAILY;UNTIL=20261019", "2026-10-16T09:00:00+02:00", "2026-10-19T09:00:00+02:00"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+Tests du déclenchement des rappels (reminder_scheduler)
+"""
+import unittest
+
+from mongomock_motor import AsyncMongoMockClient
+
+from reminder_scheduler import ReminderScheduler
+
+DUE = "2026-10-16T09:00:00+02:00"
+NEXT = "2026-10-17T09:00:00+02:00"
+
+
+class FireTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.reminders = AsyncMongoMockClient()["test"]["reminders"]
+        await self.reminders.insert_one({"id": "r1", "status": "scheduled", "datetime_iso": DUE, "version": 1})
+        self.written = []
+        self.edit_while_firing = False
+        self.scheduler = ReminderScheduler(self.reminders, self.on_due, on_written=self.on_written)
+
+    async def on_due(self, reminder):
+        if self.edit_while_firing:
+            await self.reminders.update_one({"id": "r1"}, {"$set": {"datetime_iso": "2026-10-20T10:00:00+02:00"}})
+        return {"datetime_iso": NEXT, "seq": 7}
+
+    async def on_written(self, reminder, advance, written):
+        self.written.append((advance["seq"], written))
+
+    async def test_completion_write_confirmed(self):
+        await self.scheduler._fire("r1", DUE)
+        self.assertEqual(self.written, [(7, True)])
+        doc = await self.reminders.find_one({"id": "r1"})
+        self.assertEqual((doc["datetime_iso"], doc["fired_for"], doc["version"]), (NEXT, DUE, 2))
+        self.assertNotIn("lease_owner", doc)
+
+    async def test_edit_while_firing_is_not_published(self):
+        """Une modification concurrente l'emporte : rien n'est publié, mais la séquence est rendue"""
+        self.edit_while_firing = True
+        await self.scheduler._fire("r1", DUE)
+        self.assertEqual(self.written, [(7, False)])
+        doc = await self.reminders.find_one({"id": "r1"})
+        self.assertEqual(doc["datetime_iso"], "2026-10-20T10:00:00+02:00")
+        self.assertNotIn("fired_for", doc)
+        self.assertNotIn("lease_owner", doc)
+
+    async def test_failed_write_releases(self):
+        async def failing_update(*args, **kwargs):
+            raise RuntimeError("mongo indisponible")
+
+        self.reminders.update_one = failing_update
+        await self.scheduler._fire("r1", DUE)
+        self.assertEqual(self.written, [(7, False)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Tests du cache des rappels à venir (upcoming_cache)
+"""
+import asyncio
+import time
+import unittest
+from datetime import datetime, timedelta
+
+import pytz
+from mongomock_motor import AsyncMongoMockClient
+
+from upcoming_cache import UpcomingCache
+
+FIELDS = ("id", "title", "datetime_iso", "timezone", "status")
+
+
+def reminder(reminder_id: str, due_at: datetime) -> dict:
+    return {
+        "id": reminder_id,
+        "title": reminder_id,
+        "datetime_iso": pytz.utc.localize(due_at).isoformat(),
+        "timezone": "UTC",
+        "status": "scheduled",
+        "due_at": due_at,
+    }
+
+
+class UpcomingCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.reminders = AsyncMongoMockClient()["test"]["reminders"]
+        self.version = 0
+        self.cache = UpcomingCache(self.reminders, FIELDS, reconcile_seconds=60)
+        self.soon = datetime.utcnow().replace(microsecond=0) + timedelta(hours=1)
+        self.range = (self.soon - timedelta(hours=2), self.soon + timedelta(hours=2))
+
+    async def current_version(self) -> int:
+        return self.version
+
+    async def wait_for_reconciles(self, count: int):
+        for _ in range(40):
+            if self.cache.stats()["reconciles"] >= count:
+                break
+            await asyncio.sleep(0.05)
+        self.assertEqual(self.cache.stats()["reconciles"], count)
+
+    def titles(self, version: int):
+        found = self.cache.query(version, *self.range)
+        return None if found is None else [doc["title"] for _, doc in found]
+
+    async def test_local_writes_keep_the_cache_in_step(self):
+        await self.cache.reconcile(self.current_version)
+        self.cache.apply({"type": "created", "seq": 1, "reminder": reminder("a", self.soon)})
+        self.cache.apply({"type": "created", "seq": 2, "reminder": reminder("b", self.soon - timedelta(minutes=5))})
+        self.assertEqual(self.titles(2), ["b", "a"])
+        self.cache.apply({"type": "deleted", "seq": 3, "id": "b"})
+        self.assertEqual(self.titles(3), ["a"])
+
+    async def test_version_gap_triggers_a_reconcile(self):
+        """Une séquence manquante (écriture d'un autre worker) désactive le cache jusqu'à la réconciliation"""
+        self.cache.start(self.current_version)
+        self.addAsyncCleanup(self.cache.stop)
+        await self.wait_for_reconciles(1)
+
+        # seq 1 écrite par un autre worker, seq 2 par celui-ci
+        await self.reminders.insert_many([reminder("remote", self.soon), reminder("local", self.soon)])
+        self.cache.apply({"type": "created", "seq": 2, "reminder": reminder("local", self.soon)})
+        self.version = 2
+        self.assertEqual(self.cache.stats()["version"], 0)
+        self.assertIsNone(self.titles(2))
+        # Retard qui dure au-delà d'une seconde : réconciliation anticipée
+        self.cache._behind_since = time.monotonic() - 2
+        self.assertIsNone(self.titles(2))
+
+        await self.wait_for_reconciles(2)
+        self.assertEqual(self.titles(2), ["local", "remote"])
+
+
+if __name__ == "__main__":
+    unittest.main()